@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from hms_config.admin_utils import LargeTableAdminMixin
 from .models import User
 
 @admin.register(User)
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     list_display = ['username', 'email', 'role', 'is_staff']
     list_filter = ['role', 'is_staff', 'is_active']
     fieldsets = UserAdmin.fieldsets + (
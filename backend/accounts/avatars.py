@@ -0,0 +1,76 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import User
+
+VARIANT_DIR = 'profiles/variants'
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='avatars')
+
+
+def render_variant(image, size):
+    """Square-crop and re-encode `image` as a `size`px JPEG, returning the bytes"""
+    variant = ImageOps.fit(image, (size, size), Image.LANCZOS).convert('RGB')
+    buffer = BytesIO()
+    variant.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_variants(user_id):
+    """Write every AVATAR_VARIANTS size for the user's current picture"""
+    user = User.objects.get(pk=user_id)
+    source = user.profile_picture.name
+    if not source:
+        return
+    with user.profile_picture.open('rb') as handle:
+        image = ImageOps.exif_transpose(Image.open(handle))
+        image.load()
+
+    variants = {'source': source}
+    for name, size in settings.AVATAR_VARIANTS.items():
+        data = render_variant(image, size)
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        path = f'{VARIANT_DIR}/{digest}-{size}.jpg'
+        # Identical content maps to the same name, so existing files are reused
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(data))
+        variants[name] = path
+
+    # Skip the write if the picture was replaced while we were rendering
+    User.objects.filter(pk=user_id, profile_picture=source).update(profile_picture_variants=variants)
+
+
+def _generate_in_background(user_id):
+    try:
+        generate_variants(user_id)
+    finally:
+        connection.close()
+
+
+def schedule_variants(user):
+    """Generate the user's variants after commit, off the request thread when AVATAR_VARIANTS_ASYNC"""
+    if settings.AVATAR_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: _executor.submit(_generate_in_background, user.pk))
+    else:
+        transaction.on_commit(lambda: generate_variants(user.pk))
+
+
+def variant_urls(user, request=None):
+    variants = user.profile_picture_variants or {}
+    if not user.profile_picture or variants.get('source') != user.profile_picture.name:
+        # Not generated yet for the current picture
+        return {}
+    urls = {}
+    for name in settings.AVATAR_VARIANTS:
+        path = variants.get(name)
+        if path:
+            url = default_storage.url(path)
+            urls[name] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from accounts.avatars import generate_variants
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = "Generate missing profile picture variants, e.g. for pictures uploaded before the pipeline existed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        users = User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        generated = 0
+        for user in users.only('id', 'profile_picture', 'profile_picture_variants').iterator():
+            if options['force'] or user.profile_picture_variants.get('source') != user.profile_picture.name:
+                generate_variants(user.pk)
+                generated += 1
+        self.stdout.write(f"Generated variants for {generated} user(s)")
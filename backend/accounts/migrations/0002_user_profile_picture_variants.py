@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies of profile_picture, by variant name'),
+        ),
+    ]
@@ -13,6 +13,7 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='patient')
     phone = models.CharField(max_length=15, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of profile_picture, by variant name")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -1,13 +1,19 @@
 from rest_framework import serializers
 from .models import User
+from .avatars import variant_urls
 from django.contrib.auth.password_validation import validate_password
 from patients.models import Patient
+from patients.duplicates import find_candidates, record as record_duplicates
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 class PatientSignupSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    # Stored in PatientClinicalText
+    allergies = serializers.CharField(required=False, allow_blank=True)
+    chronic_conditions = serializers.CharField(required=False, allow_blank=True)
+    current_medications = serializers.CharField(required=False, allow_blank=True)
 
     class Meta:
         model = Patient
@@ -36,13 +42,20 @@ class PatientSignupSerializer(serializers.ModelSerializer):
         
         # Create Patient object with remaining validated data + user
         patient = Patient.objects.create(user=user, **validated_data)
+        # Self-registration is never blocked or shown other records; staff review the flags
+        record_duplicates(patient, find_candidates(validated_data, exclude_id=patient.pk))
         return patient
 
 class UserSerializer(serializers.ModelSerializer):
+    profile_picture_variants = serializers.SerializerMethodField()
+    
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'role', 'phone', 'profile_picture', 'first_name', 'last_name']
+        fields = ['id', 'username', 'email', 'role', 'phone', 'profile_picture', 'profile_picture_variants', 'first_name', 'last_name']
         read_only_fields = ['id']
+    
+    def get_profile_picture_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .avatars import schedule_variants
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def refresh_profile_picture_variants(sender, instance, **kwargs):
+    picture = instance.profile_picture
+    if picture and (instance.profile_picture_variants or {}).get('source') != picture.name:
+        schedule_variants(instance)
@@ -1,3 +1,119 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from PIL import Image
+
+from hms_config.testing import clear_caches, client_for, make_user
+from .avatars import generate_variants
+from .models import User
+from .throttles import LoginIPThrottle
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def picture(name='me.png', color='red', size=(400, 300)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, AVATAR_VARIANTS_ASYNC=False,
+                   AVATAR_VARIANTS={'small': 48, 'large': 256})
+class AvatarVariantTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        clear_caches()
+        self.user = make_user('doctor')
+        self.client = client_for(self.user)
+
+    def upload(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/auth/profile/', {'profile_picture': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.user.refresh_from_db()
+
+    def test_upload_generates_square_variants(self):
+        self.upload(picture())
+        variants = self.user.profile_picture_variants
+        self.assertEqual(variants['source'], self.user.profile_picture.name)
+        for name, size in (('small', 48), ('large', 256)):
+            with default_storage.open(variants[name]) as handle:
+                self.assertEqual(Image.open(handle).size, (size, size))
+        urls = self.client.get('/api/auth/profile/').data['profile_picture_variants']
+        self.assertEqual(set(urls), {'small', 'large'})
+
+    def test_identical_pictures_share_variant_files(self):
+        self.upload(picture())
+        other = make_user('nurse', profile_picture=picture('other.png'))
+        generate_variants(other.pk)
+        other.refresh_from_db()
+        self.assertEqual(other.profile_picture_variants['small'], self.user.profile_picture_variants['small'])
+
+    def test_stale_variants_are_not_served_for_a_new_picture(self):
+        self.upload(picture())
+        User.objects.filter(pk=self.user.pk).update(profile_picture='profiles/replaced.png')
+        client = client_for(User.objects.get(pk=self.user.pk))
+        self.assertEqual(client.get('/api/auth/profile/').data['profile_picture_variants'], {})
+
+
+@override_settings(AUTH_THROTTLE_BUCKETS={'login_ip': (3, 1)})
+class AuthThrottleTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def login(self, **headers):
+        return self.client.post('/api/auth/login/', {'username': 'nobody', 'password': 'wrong'}, **headers)
+
+    def test_bucket_empties_and_reports_the_wait(self):
+        self.assertEqual([self.login().status_code for _ in range(3)], [401, 401, 401])
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        statuses = [self.login(HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code for n in range(4)]
+        self.assertEqual(statuses[-1], 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1})
+    def test_forwarded_for_names_the_client_behind_a_proxy(self):
+        statuses = [self.login(HTTP_X_FORWARDED_FOR=f'10.0.0.{n}').status_code for n in range(4)]
+        self.assertEqual(statuses, [401] * 4)
+
+    def test_concurrent_requests_cannot_share_a_token(self):
+        request = RequestFactory().post('/api/auth/login/', REMOTE_ADDR='10.1.1.1')
+        start = threading.Barrier(12)
+        allowed = []
+
+        def attempt():
+            start.wait()
+            allowed.append(LoginIPThrottle().allow_request(request, None))
+
+        real_get = LocMemCache.get
+
+        def slow_get(*args, **kwargs):
+            # Widen the window between reading and writing the bucket
+            value = real_get(*args, **kwargs)
+            time.sleep(0.005)
+            return value
+
+        # Each thread has its own cache connection, so patch the backend class
+        with mock.patch.object(LocMemCache, 'get', slow_get):
+            threads = [threading.Thread(target=attempt) for _ in range(12)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(allowed.count(True), 3)
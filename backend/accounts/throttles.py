@@ -0,0 +1,105 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+# A bucket's read-modify-write runs under a cache.add lock held at most this long
+LOCK_SECONDS = 2
+LOCK_ATTEMPTS = 20
+LOCK_RETRY_SECONDS = 0.01
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket kept in the shared cache, sized by AUTH_THROTTLE_BUCKETS[scope].
+
+    Throttles run before the view parses credentials, so over-limit requests
+    are rejected without any password hashing or database work. Updates to
+    one bucket are serialized with a lock taken through cache.add, which is
+    atomic in every shared cache backend, so concurrent requests cannot all
+    spend the same token. A request that cannot get the lock is throttled.
+    """
+    scope = None
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        ident = self.get_bucket_ident(request)
+        if not ident or self.scope not in settings.AUTH_THROTTLE_BUCKETS:
+            return True
+        capacity, per_minute = settings.AUTH_THROTTLE_BUCKETS[self.scope]
+        digest = hashlib.sha1(str(ident).encode()).hexdigest()
+        key = f'throttle:{self.scope}:{digest}'
+        lock = f'{key}:lock'
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(lock, 1, LOCK_SECONDS):
+                break
+            time.sleep(LOCK_RETRY_SECONDS)
+        else:
+            self.wait_seconds = 1
+            return False
+        try:
+            return self.consume(key, capacity, per_minute)
+        finally:
+            cache.delete(lock)
+
+    def consume(self, key, capacity, per_minute):
+        """Take one token from the bucket at `key`; call with its lock held"""
+        now = time.time()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * per_minute / 60)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_seconds = (1 - tokens) * 60 / per_minute
+        # Keep the entry only as long as it takes to refill completely
+        cache.set(key, (tokens, now), math.ceil(capacity * 60 / per_minute))
+        return allowed
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class FieldBucketThrottle(TokenBucketThrottle):
+    """Bucket per value of a request body field, e.g. the username being tried"""
+    field = None
+
+    def get_bucket_ident(self, request):
+        try:
+            value = request.data.get(self.field)
+        except Exception:
+            return None
+        return value.strip().lower() if isinstance(value, str) else None
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = 'login_ip'
+
+
+class LoginUsernameThrottle(FieldBucketThrottle):
+    scope = 'login_username'
+    field = 'username'
+
+
+class TokenRefreshIPThrottle(TokenBucketThrottle):
+    scope = 'refresh_ip'
+
+
+class SignupIPThrottle(TokenBucketThrottle):
+    scope = 'signup_ip'
+
+
+class SignupEmailThrottle(FieldBucketThrottle):
+    scope = 'signup_email'
+    field = 'email'
+
+
+class RegisterUsernameThrottle(FieldBucketThrottle):
+    scope = 'register_username'
+    field = 'username'
@@ -1,13 +1,21 @@
 from os import path
+from django.conf import settings
+from django.views.static import serve
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from hms_config.idempotency import IdempotentCreateMixin
+from .avatars import VARIANT_DIR
 from .models import User
 from .serializers import PatientSignupSerializer
 from .serializers import UserSerializer, RegisterSerializer
+from .throttles import (
+    LoginIPThrottle, LoginUsernameThrottle, TokenRefreshIPThrottle,
+    SignupIPThrottle, SignupEmailThrottle, RegisterUsernameThrottle,
+)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
@@ -17,16 +25,22 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
-class PatientSignupView(generics.CreateAPIView):
+class ThrottledTokenRefreshView(TokenRefreshView):
+    throttle_classes = [TokenRefreshIPThrottle]
+
+class PatientSignupView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = PatientSignupSerializer
     permission_classes = [AllowAny]  
+    throttle_classes = [SignupIPThrottle, SignupEmailThrottle]
 
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = RegisterSerializer
+    throttle_classes = [SignupIPThrottle, RegisterUsernameThrottle]
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
     queryset = User.objects.all()
@@ -42,4 +56,10 @@ def get_doctors(request):
     """Get all users with doctor role"""
     doctors = User.objects.filter(role='doctor', is_active=True)
     serializer = UserSerializer(doctors, many=True)
-    return Response(serializer.data)
\ No newline at end of file
+    return Response(serializer.data)
+
+def profile_picture_variant(request, path):
+    """Serve a resized profile picture; names are content hashes, so they can be cached forever"""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT / VARIANT_DIR)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -1,13 +1,15 @@
 from django.contrib import admin
+from hms_config.admin_utils import LargeTableAdminMixin, date_drilldown, staff_filter
 from .models import Appointment
 
 @admin.register(Appointment)
-class AppointmentAdmin(admin.ModelAdmin):
+class AppointmentAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['appointment_id', 'patient', 'doctor', 'appointment_date', 'appointment_time', 'status', 'appointment_type']
-    list_filter = ['status', 'appointment_type', 'appointment_date', 'doctor']
+    list_filter = ['status', 'appointment_type', date_drilldown('appointment_date'), staff_filter('doctor', 'doctor')]
+    list_select_related = ['patient', 'doctor']
+    autocomplete_fields = ['patient', 'doctor', 'created_by']
     search_fields = ['appointment_id', 'patient__first_name', 'patient__last_name', 'doctor__first_name', 'doctor__last_name']
     readonly_fields = ['appointment_id', 'created_at', 'updated_at']
-    date_hierarchy = 'appointment_date'
     
     fieldsets = (
         ('Appointment Information', {
@@ -0,0 +1,77 @@
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+
+
+class SlotUnavailable(APIException):
+    status_code = 409
+    default_detail = 'This slot is no longer available.'
+    default_code = 'slot_unavailable'
+
+
+# Changes to one hold are serialized by a cache.add lock held at most this long
+LOCK_SECONDS = 2
+LOCK_ATTEMPTS = 20
+
+
+def _key(doctor_id, day, at):
+    return f'slot-hold:{doctor_id}:{day:%Y-%m-%d}:{at:%H:%M}'
+
+
+@contextmanager
+def _locked(key):
+    """
+    Yield True once the caller holds `key`'s lock, or False if it stays taken.
+
+    The cache has no compare-and-set, so checking who holds a slot and then
+    changing it is only safe while no one else can change it in between.
+    """
+    lock = f'{key}:lock'
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, True, LOCK_SECONDS):
+            try:
+                yield True
+            finally:
+                cache.delete(lock)
+            return
+        time.sleep(0.01)
+    yield False
+
+
+def reserve(doctor_id, day, at, user):
+    """
+    Hold a slot for `user` for SLOT_HOLD_SECONDS.
+
+    Of several users racing for the same slot exactly one wins. Returns the
+    expiry, or None if someone else holds it.
+    """
+    key = _key(doctor_id, day, at)
+    with _locked(key) as locked:
+        if not locked or cache.get(key) not in (None, user.pk):
+            return None
+        # Re-reserving extends the user's own hold
+        cache.set(key, user.pk, settings.SLOT_HOLD_SECONDS)
+    return timezone.now() + timedelta(seconds=settings.SLOT_HOLD_SECONDS)
+
+
+def holder(doctor_id, day, at):
+    return cache.get(_key(doctor_id, day, at))
+
+
+def release(doctor_id, day, at, user):
+    """Drop `user`'s hold; a hold that expired and went to someone else is left alone"""
+    key = _key(doctor_id, day, at)
+    with _locked(key) as locked:
+        if locked and cache.get(key) == user.pk:
+            cache.delete(key)
+
+
+def held_by_others(doctor_id, day, times, user):
+    """The subset of `times` currently held by anyone but `user`, in one cache round trip"""
+    keys = {_key(doctor_id, day, at): at for at in times}
+    return {keys[key] for key, pk in cache.get_many(keys).items() if pk != user.pk}
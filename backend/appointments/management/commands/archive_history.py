@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointments.models import Appointment, ArchivedAppointment
+from hms_config.archival import archive_in_batches
+from patients.models import ArchivedMedicalRecord, MedicalRecord
+
+CLOSED_STATUSES = ('completed', 'cancelled', 'no_show')
+
+
+class Command(BaseCommand):
+    help = "Move closed appointments and medical records older than N months into archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12,
+                            help='Archive rows older than this many months')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=0,
+                            help='Stop after this many batches per table; rerun to resume')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=30 * options['months'])
+        jobs = [
+            ('appointments', ArchivedAppointment, Appointment.objects.filter(
+                status__in=CLOSED_STATUSES, appointment_date__lt=cutoff.date()), None),
+            # Archived records keep their text inline, read from the MedicalRecordText side row
+            ('medical records', ArchivedMedicalRecord, MedicalRecord.objects.filter(
+                visit_date__lt=cutoff), {
+                    field: f'clinical_text__{field}' for field in MedicalRecord.CLINICAL_TEXT_FIELDS
+                }),
+        ]
+        for label, archive_model, queryset, sources in jobs:
+            moved = 0
+            for batch_number, count in enumerate(
+                    archive_in_batches(queryset, archive_model, options['batch_size'], sources), start=1):
+                moved += count
+                if batch_number == options['max_batches']:
+                    break
+            self.stdout.write(f"Archived {moved} {label}")
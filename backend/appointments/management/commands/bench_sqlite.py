@@ -0,0 +1,132 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, OperationalError, connection
+
+from accounts.models import User
+from appointments.models import Appointment
+from hms_config.write_queue import run_write
+from patients.models import Patient
+
+PROFILES = [
+    ('default', {'HMS_SQLITE_PROFILE': 'default'}),
+    ('concurrent', {'HMS_SQLITE_PROFILE': 'concurrent'}),
+    ('concurrent+queue', {'HMS_SQLITE_PROFILE': 'concurrent', 'HMS_SQLITE_WRITE_QUEUE': '1'}),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark mixed booking/read traffic against each SQLite engine profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200, help='Operations per thread')
+        parser.add_argument('--write-ratio', type=float, default=0.3)
+        parser.add_argument('--worker', action='store_true',
+                            help='Internal: run one profile against HMS_SQLITE_NAME')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(self.run_worker(options)))
+            return
+
+        self.stdout.write(f"{'profile':<18}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+                          f"{'locked':>8}{'conflicts':>11}")
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, env in PROFILES:
+                env = {**os.environ, **env, 'HMS_SQLITE_NAME': os.path.join(tmp, f'{name}.sqlite3')}
+                output = subprocess.run(
+                    [sys.executable, sys.argv[0], 'bench_sqlite', '--worker',
+                     '--threads', str(options['threads']), '--ops', str(options['ops']),
+                     '--write-ratio', str(options['write_ratio'])],
+                    env=env, capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"{name:<18}{result['throughput']:>10.1f}{result['p50_ms']:>10.2f}"
+                    f"{result['p99_ms']:>10.2f}{result['locked']:>8}{result['conflicts']:>11}"
+                )
+
+    def run_worker(self, options):
+        call_command('migrate', verbosity=0)
+        doctors = [
+            User.objects.create_user(username=f'bench-doctor-{i}', password='bench', role='doctor')
+            for i in range(5)
+        ]
+        patients = [
+            Patient.objects.create(
+                first_name='Bench', last_name=str(i), date_of_birth=date(1980, 1, 1), gender='other',
+                blood_group='O+', email=f'bench{i}@example.com', phone='0', address='-', city='-',
+                state='-', zip_code='0', emergency_contact_name='-', emergency_contact_phone='0',
+                emergency_contact_relation='-',
+            )
+            for i in range(50)
+        ]
+        connection.close()
+
+        latencies = []
+        counters = {'locked': 0, 'conflicts': 0}
+        lock = threading.Lock()
+
+        def book(rng):
+            slot = rng.randrange(20)
+            Appointment.objects.create(
+                patient=rng.choice(patients), doctor=rng.choice(doctors), reason='bench',
+                appointment_date=date.today() + timedelta(days=rng.randrange(1, 60)),
+                appointment_time=dtime(8 + slot // 2, 30 * (slot % 2)),
+            )
+
+        def read(rng):
+            list(Appointment.objects.upcoming().select_related('patient', 'doctor')[:20])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local, local_counters = [], {'locked': 0, 'conflicts': 0}
+            for _ in range(options['ops']):
+                started = time.perf_counter()
+                try:
+                    if rng.random() < options['write_ratio']:
+                        run_write(lambda: book(rng))
+                    else:
+                        read(rng)
+                except OperationalError:
+                    local_counters['locked'] += 1
+                except IntegrityError:
+                    local_counters['conflicts'] += 1
+                local.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                latencies.extend(local)
+                for key, value in local_counters.items():
+                    counters[key] += value
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            **counters,
+        }
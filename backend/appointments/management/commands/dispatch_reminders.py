@@ -0,0 +1,28 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from appointments.reminders import dispatch, get_sender
+
+
+class Command(BaseCommand):
+    help = "Send due appointment notifications from the outbox; run several for more throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain due messages once and exit')
+
+    def handle(self, *args, **options):
+        worker_id = uuid.uuid4().hex
+        sender = get_sender()
+        while True:
+            handled = dispatch(worker_id, options['batch_size'], sender)
+            if handled:
+                self.stdout.write(f"Handled {handled} outbox message(s)")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
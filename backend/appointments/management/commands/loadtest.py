@@ -0,0 +1,242 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from patients.models import Patient
+
+PASSWORD = 'loadtest-Pass-123'
+WORKFLOWS = ('login', 'nurse_shift', 'front_desk', 'doctor_dashboard')
+ROLES = {'login': 'nurse', 'nurse_shift': 'nurse', 'front_desk': 'desk', 'doctor_dashboard': 'doctor'}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Client:
+    """Minimal JSON client for one virtual user"""
+
+    def __init__(self, base_url, record):
+        self.base_url = base_url.rstrip('/')
+        self.record = record
+        self.token = None
+
+    def request(self, step, method, path, payload=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status, body = exc.code, exc.read()
+        except OSError:
+            status, body = 0, b''
+        self.record(step, time.perf_counter() - started, status, body)
+        try:
+            return status, json.loads(body or b'null')
+        except ValueError:
+            return status, None
+
+    def login(self, username):
+        status, body = self.request('login', 'POST', '/api/auth/login/',
+                                    {'username': username, 'password': PASSWORD})
+        self.token = body['access'] if status == 200 else None
+        return body['user'] if status == 200 else None
+
+
+class Command(BaseCommand):
+    """
+    Run virtual users through scripted staff workflows against a live server.
+
+    Start the server with HMS_AUTH_THROTTLE=0 to measure capacity; with the
+    throttles on, the login step reports the 429s they produce instead.
+    """
+    help = "Drive concurrent clinical workflows against a running server and compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+        parser.add_argument('--workflows', default=','.join(WORKFLOWS),
+                            help=f"Comma-separated subset of {', '.join(WORKFLOWS)}")
+        parser.add_argument('--seed', action='store_true',
+                            help='Create the loadtest-* staff and patients first (server must share this database)')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'loadtest_baseline.json'),
+                            help='Timings to compare with; machine specific, so the default path is git-ignored')
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--max-regression', type=float, default=0.25,
+                            help='Allowed relative p95 increase over the baseline')
+
+    def handle(self, *args, **options):
+        workflows = [name.strip() for name in options['workflows'].split(',') if name.strip()]
+        unknown = set(workflows) - set(WORKFLOWS)
+        if unknown:
+            raise CommandError(f"Unknown workflows: {', '.join(sorted(unknown))}")
+        if options['seed']:
+            self.seed(options['users'])
+
+        samples = defaultdict(list)
+        statuses = defaultdict(lambda: defaultdict(int))
+        conflicts = defaultdict(int)
+        lock = threading.Lock()
+
+        def record(step, elapsed, status, body):
+            with lock:
+                samples[step].append(elapsed)
+                statuses[step][status] += 1
+                # Double bookings rejected by validation (400) or, after losing the race, with 409
+                if status == 409 or (status == 400 and b'unique' in body):
+                    conflicts[step] += 1
+
+        deadline = time.monotonic() + options['duration']
+        threads = [
+            threading.Thread(target=self.virtual_user, args=(i, workflows, options['base_url'], record, deadline))
+            for i in range(options['users'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        report = {}
+        for step, latencies in sorted(samples.items()):
+            errors = sum(count for status, count in statuses[step].items() if not 200 <= status < 300)
+            report[step] = {
+                'requests': len(latencies),
+                'throughput': len(latencies) / elapsed,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'error_rate': errors / len(latencies),
+                'conflicts': conflicts[step],
+                'statuses': {str(status): count for status, count in sorted(statuses[step].items())},
+            }
+        self.print_report(report)
+        self.compare(report, options)
+
+    def virtual_user(self, index, workflows, base_url, record, deadline):
+        rng = random.Random(f'{time.time()}-{index}')
+        sessions = {}
+        while time.monotonic() < deadline:
+            workflow = rng.choice(workflows)
+            username = f'loadtest-{ROLES[workflow]}-{index}'
+            if workflow == 'login':
+                # Fresh sign-in every iteration; counts against the login throttles
+                Client(base_url, record).login(username)
+                continue
+            if workflow not in sessions:
+                client = Client(base_url, record)
+                user = client.login(username)
+                if user is None:
+                    time.sleep(1)
+                    continue
+                sessions[workflow] = (client, user)
+            client, user = sessions[workflow]
+            getattr(self, workflow)(client, user, rng)
+
+    def nurse_shift(self, client, user, rng):
+        client.request('nurse-today', 'GET', '/api/appointments/nurse-today/')
+        client.request('assigned-to-me', 'GET', '/api/patients/assigned-to-me/')
+        client.request('my-tasks', 'GET', '/api/nurse-tasks/tasks/my-tasks/')
+
+    def front_desk(self, client, user, rng):
+        _, doctors = client.request('doctors', 'GET', '/api/auth/doctors/')
+        _, patients = client.request('patients', 'GET', '/api/patients/')
+        if not doctors or not patients or not patients.get('results'):
+            return
+        slot = rng.randrange(16)
+        booking = {
+            'patient': rng.choice(patients['results'])['id'],
+            'doctor': rng.choice(doctors)['id'],
+            'appointment_date': (date.today() + timedelta(days=rng.randrange(1, 30))).isoformat(),
+            'appointment_time': f'{9 + slot // 2:02d}:{30 * (slot % 2):02d}',
+        }
+        status, _ = client.request('book', 'POST', '/api/appointments/', {**booking, 'reason': 'Load test'})
+        if status != 201:
+            return
+        query = f"doctor={booking['doctor']}&patient={booking['patient']}&appointment_date={booking['appointment_date']}"
+        _, listing = client.request('find-booking', 'GET', f'/api/appointments/?{query}')
+        if listing and listing.get('results'):
+            client.request('confirm', 'POST', f"/api/appointments/{listing['results'][0]['id']}/confirm/")
+
+    def doctor_dashboard(self, client, user, rng):
+        client.request('today', 'GET', '/api/appointments/today/')
+        client.request('upcoming', 'GET', '/api/appointments/upcoming/')
+        client.request('doctor-appointments', 'GET', f"/api/appointments/?doctor={user['id']}")
+        client.request('doctor-records', 'GET', f"/api/medical-records/?doctor={user['id']}")
+
+    def seed(self, users):
+        staff = {}
+        for role, prefix in (('nurse', 'nurse'), ('receptionist', 'desk'), ('doctor', 'doctor')):
+            for i in range(users):
+                user, created = User.objects.get_or_create(
+                    username=f'loadtest-{prefix}-{i}',
+                    defaults={'role': role, 'first_name': prefix.title(), 'last_name': str(i)},
+                )
+                if created:
+                    user.set_password(PASSWORD)
+                    user.save()
+                staff.setdefault(role, []).append(user)
+        for i in range(users * 5):
+            Patient.all_objects.get_or_create(email=f'loadtest-patient-{i}@example.com', defaults=dict(
+                first_name='Load', last_name=f'Test {i}', date_of_birth=date(1970, 1, 1) + timedelta(days=i * 97),
+                gender='other', blood_group='O+', phone='0000000000', address='-', city='-', state='-',
+                zip_code='00000', emergency_contact_name='-', emergency_contact_phone='0',
+                emergency_contact_relation='-', assigned_nurse=staff['nurse'][i % users],
+            ))
+        self.stdout.write(f"Seeded {users} user(s) per role and {users * 5} patients")
+
+    def print_report(self, report):
+        self.stdout.write(f"{'step':<22}{'reqs':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'errors':>8}{'conflicts':>11}  statuses")
+        for step, row in report.items():
+            self.stdout.write(
+                f"{step:<22}{row['requests']:>7}{row['throughput']:>9.1f}{row['p50_ms']:>9.1f}"
+                f"{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['error_rate']:>8.1%}"
+                f"{row['conflicts']:>11}  {row['statuses']}"
+            )
+
+    def compare(self, report, options):
+        path = options['baseline']
+        if options['save_baseline']:
+            with open(path, 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {path}")
+            return
+        try:
+            with open(path) as handle:
+                baseline = json.load(handle)
+        except FileNotFoundError:
+            self.stdout.write("No baseline found; run with --save-baseline to record one")
+            return
+
+        regressions = []
+        for step, row in report.items():
+            base = baseline.get(step)
+            if not base:
+                continue
+            if row['p95_ms'] > base['p95_ms'] * (1 + options['max_regression']):
+                regressions.append(f"{step}: p95 {row['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms")
+            if row['error_rate'] > base['error_rate'] + 0.01:
+                regressions.append(f"{step}: error rate {row['error_rate']:.1%} vs baseline {base['error_rate']:.1%}")
+        if regressions:
+            raise CommandError("Regressed against baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write("No regressions against baseline")
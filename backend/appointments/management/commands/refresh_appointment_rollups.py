@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointments.rollups import refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh daily appointment rollups for days changed since the last run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild every day. Only needed after writes that bypass save() and '
+                                 'leave updated_at alone, e.g. raw SQL, or when rollup rows were lost')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Repeat every N seconds instead of running once')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            days = refresh(full=full)
+            self.stdout.write(f"Refreshed rollups for {days} day(s)")
+            if not options['interval']:
+                break
+            full = False
+            time.sleep(options['interval'])
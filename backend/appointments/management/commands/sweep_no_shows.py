@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointments.models import Appointment
+from hms_config.object_cache import invalidate
+from nurse_tasks import handover
+from patients.activity import refresh as refresh_activity
+
+
+class Command(BaseCommand):
+    help = "Mark past-due scheduled/confirmed appointments as no_show in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Maximum rows updated per statement')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='How long after the start time an appointment becomes a no-show')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Repeat every N seconds instead of running once')
+
+    def handle(self, *args, **options):
+        while True:
+            swept = self.sweep(options['batch_size'], timedelta(minutes=options['grace_minutes']))
+            self.stdout.write(f"Marked {swept} appointment(s) as no_show")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size, grace):
+        now = timezone.localtime()
+        total = 0
+        while True:
+            # Each batch is its own short UPDATE so bookings are never blocked for long
+            rows = list(
+                Appointment.objects.past_due(now, grace)
+                .order_by('appointment_date', 'appointment_time')
+                .values_list('id', 'patient_id')[:batch_size]
+            )
+            if not rows:
+                return total
+            total += Appointment.objects.filter(id__in=[row[0] for row in rows]).past_due(now, grace).update(
+                status='no_show', updated_at=timezone.now()
+            )
+            # update() skips signals, so refresh activity and cached responses here
+            refresh_activity({row[1] for row in rows})
+            invalidate(Appointment, [row[0] for row in rows])
+            handover.schedule_forget(patient_ids={row[1] for row in rows})
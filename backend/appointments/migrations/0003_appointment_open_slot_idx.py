@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_appointment_assigned_nurse'),
+        ('patients', '0003_patientassignmentlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ('scheduled', 'confirmed'))), fields=['appointment_date', 'appointment_time'], name='appointment_open_slot_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_archivedappointment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('reminder', 'Reminder'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time a worker may dispatch this')),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('claimed_by', models.CharField(blank=True, max_length=64)),
+                ('claimed_until', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='appointments.appointment')),
+            ],
+            options={
+                'ordering': ['available_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['available_at'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_reminderoutbox'),
+        ('patients', '0005_medical_record_visit_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date'], name='appointment_date_idx'),
+        ),
+    ]
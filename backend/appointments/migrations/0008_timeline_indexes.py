@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_rollups'),
+        ('patients', '0009_timeline_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date', 'appointment_time'], name='appointment_patient_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
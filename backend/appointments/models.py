@@ -1,7 +1,49 @@
+from datetime import datetime, timedelta
 from django.db import models
+from django.db.models import BooleanField, Case, Q, Value, When
+from django.utils import timezone
 from accounts.models import User
 from patients.models import Patient
 
+OPEN_STATUSES = ('scheduled', 'confirmed')
+
+
+def _after(moment):
+    """Q matching appointments whose start is strictly after `moment`"""
+    return Q(appointment_date__gt=moment.date()) | Q(
+        appointment_date=moment.date(), appointment_time__gt=moment.time()
+    )
+
+
+def _before(moment):
+    """Q matching appointments whose start is strictly before `moment`"""
+    return Q(appointment_date__lt=moment.date()) | Q(
+        appointment_date=moment.date(), appointment_time__lt=moment.time()
+    )
+
+
+class AppointmentQuerySet(models.QuerySet):
+    def upcoming(self, now=None):
+        now = now or timezone.localtime()
+        return self.filter(_after(now), status__in=OPEN_STATUSES)
+
+    def past_due(self, now=None, grace=timedelta(0)):
+        cutoff = (now or timezone.localtime()) - grace
+        return self.filter(_before(cutoff), status__in=OPEN_STATUSES)
+
+    def occupying(self, doctor_id, day):
+        """Rows holding one of the doctor's slots on `day`; cancelled rows keep theirs under the unique constraint"""
+        return self.filter(doctor_id=doctor_id, appointment_date=day)
+
+    def with_is_upcoming(self, now=None):
+        now = now or timezone.localtime()
+        return self.annotate(is_upcoming=Case(
+            When(_after(now) & Q(status__in=OPEN_STATUSES), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+
+
 class Appointment(models.Model):
     STATUS_CHOICES = (
         ('scheduled', 'Scheduled'),
@@ -46,9 +88,21 @@ class Appointment(models.Model):
         limit_choices_to={'role': 'nurse'}
     )
     
+    objects = AppointmentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['appointment_date', 'appointment_time']
         unique_together = ['doctor', 'appointment_date', 'appointment_time']
+        indexes = [
+            models.Index(fields=['appointment_date'], name='appointment_date_idx'),
+            models.Index(fields=['patient', 'appointment_date', 'appointment_time'], name='appointment_patient_idx'),
+            # Only open appointments are indexed, so the sweeper keeps this small
+            models.Index(
+                fields=['appointment_date', 'appointment_time'],
+                condition=Q(status__in=OPEN_STATUSES),
+                name='appointment_open_slot_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.appointment_id} - {self.patient.full_name} with Dr. {self.doctor.last_name}"
@@ -56,17 +110,148 @@ class Appointment(models.Model):
     def save(self, *args, **kwargs):
         if not self.appointment_id:
             # Generate unique appointment ID
-            last_appointment = Appointment.objects.order_by('-id').first()
+            # Archived rows keep their ids, so they must not be handed out again
+            last_appointment = max(
+                filter(None, [
+                    Appointment.objects.order_by('-id').first(),
+                    ArchivedAppointment.objects.order_by('-id').first(),
+                ]),
+                key=lambda appointment: appointment.id,
+                default=None,
+            )
             if last_appointment:
                 last_id = int(last_appointment.appointment_id.split('-')[1])
                 self.appointment_id = f"APT-{str(last_id + 1).zfill(6)}"
             else:
                 self.appointment_id = "APT-000001"
+        # A status or time change invalidates any annotated is_upcoming
+        self.__dict__.pop('_is_upcoming', None)
         super().save(*args, **kwargs)
     
+    @property
+    def starts_at(self):
+        return timezone.make_aware(datetime.combine(self.appointment_date, self.appointment_time))
+    
     @property
     def is_upcoming(self):
-        from datetime import date, time, datetime
-        now = datetime.now()
+        # Prefer the value annotated by AppointmentQuerySet.with_is_upcoming()
+        if '_is_upcoming' in self.__dict__:
+            return self._is_upcoming
+        now = timezone.localtime()
         appointment_datetime = datetime.combine(self.appointment_date, self.appointment_time)
-        return appointment_datetime > now and self.status in ['scheduled', 'confirmed']
+        return appointment_datetime > now.replace(tzinfo=None) and self.status in OPEN_STATUSES
+    
+    @is_upcoming.setter
+    def is_upcoming(self, value):
+        self._is_upcoming = value
+
+
+class ArchivedAppointment(models.Model):
+    """Closed Appointment rows moved out of the hot table by archive_history"""
+    id = models.BigIntegerField(primary_key=True)
+    appointment_id = models.CharField(max_length=20, unique=True)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='archived_appointments')
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    
+    appointment_date = models.DateField()
+    appointment_time = models.TimeField()
+    duration = models.IntegerField(default=30)
+    
+    appointment_type = models.CharField(max_length=20, choices=Appointment.APPOINTMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    
+    reason = models.TextField()
+    notes = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    assigned_nurse = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['appointment_date', 'appointment_time']
+    
+    def __str__(self):
+        return f"{self.appointment_id} - {self.patient.full_name} with Dr. {self.doctor.last_name} (archived)"
+
+
+class ReminderOutbox(models.Model):
+    """Notification written in the same transaction as the appointment change it describes"""
+    EVENT_CHOICES = (
+        ('reminder', 'Reminder'),
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    )
+    
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='outbox_messages')
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time a worker may dispatch this")
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    claimed_by = models.CharField(max_length=64, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['available_at']
+        indexes = [
+            models.Index(fields=['available_at'], condition=Q(status='pending'), name='outbox_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} for {self.appointment_id} ({self.status})"
+    
+    @classmethod
+    def enqueue(cls, appointment, event):
+        available_at = timezone.now()
+        if event == 'reminder':
+            # Reminders become due 24 hours before the appointment starts
+            available_at = max(available_at, appointment.starts_at - timedelta(hours=24))
+        return cls.objects.create(appointment=appointment, event=event, available_at=available_at)
+
+
+class AppointmentDailyRollup(models.Model):
+    """Appointment counts per day, doctor, type and status, maintained by refresh_appointment_rollups"""
+    date = models.DateField()
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    appointment_type = models.CharField(max_length=20, choices=Appointment.APPOINTMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['date']
+        unique_together = ['date', 'doctor', 'appointment_type', 'status']
+    
+    def __str__(self):
+        return f"{self.date} {self.doctor_id} {self.appointment_type}/{self.status}: {self.count}"
+
+
+class RollupDirtyDay(models.Model):
+    """A day to rebuild on the next rollup refresh because an appointment left it"""
+    date = models.DateField()
+    marked_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.date} (marked {self.marked_at})"
+
+
+class RollupWatermark(models.Model):
+    """Start time of the last successful rollup refresh, per rollup name"""
+    name = models.CharField(max_length=50, primary_key=True)
+    refreshed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.name} @ {self.refreshed_at}"
@@ -0,0 +1,115 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OPEN_STATUSES, ReminderOutbox
+
+SUBJECTS = {
+    'reminder': "Reminder: your appointment {appointment_id} is coming up",
+    'confirmed': "Your appointment {appointment_id} is confirmed",
+    'cancelled': "Your appointment {appointment_id} has been cancelled",
+}
+
+BODY = (
+    "Dear {patient},\n\n"
+    "{subject}.\n\n"
+    "Doctor: Dr. {doctor}\n"
+    "Date: {date:%A %d %B %Y}\n"
+    "Time: {time:%H:%M}\n"
+)
+
+
+class EmailSender:
+    """Send rendered reminders through Django's configured EMAIL_BACKEND"""
+
+    def send(self, messages):
+        """Send (recipient, subject, body) tuples, returning one error or None per message"""
+        errors = []
+        with mail.get_connection() as connection:
+            for recipient, subject, body in messages:
+                try:
+                    mail.EmailMessage(subject, body, to=[recipient], connection=connection).send()
+                    errors.append(None)
+                except Exception as exc:
+                    errors.append(str(exc) or exc.__class__.__name__)
+        return errors
+
+
+def get_sender():
+    return import_string(settings.REMINDER_SENDER)()
+
+
+def claim(worker_id, batch_size, lease=timedelta(minutes=5)):
+    """
+    Lease up to `batch_size` due messages to `worker_id`.
+
+    The UPDATE re-checks the lease, so concurrent workers never claim the
+    same row; a crashed worker's rows become claimable once the lease ends.
+    """
+    now = timezone.now()
+    claimable = ReminderOutbox.objects.filter(status='pending', available_at__lte=now).exclude(
+        claimed_until__gt=now)
+    ids = list(claimable.values_list('id', flat=True)[:batch_size])
+    claimable.filter(id__in=ids).update(claimed_by=worker_id, claimed_until=now + lease)
+    return list(
+        ReminderOutbox.objects.filter(id__in=ids, claimed_by=worker_id)
+        .select_related('appointment__patient', 'appointment__doctor')
+    )
+
+
+def render(message):
+    appointment = message.appointment
+    subject = SUBJECTS[message.event].format(appointment_id=appointment.appointment_id)
+    body = BODY.format(
+        patient=appointment.patient.full_name,
+        subject=subject,
+        doctor=appointment.doctor.get_full_name(),
+        date=appointment.appointment_date,
+        time=appointment.appointment_time,
+    )
+    return appointment.patient.email, subject, body
+
+
+def dispatch(worker_id=None, batch_size=100, sender=None):
+    """Claim one batch, send it and record the outcome. Returns the number of rows handled."""
+    worker_id = worker_id or uuid.uuid4().hex
+    sender = sender or get_sender()
+    now = timezone.now()
+    batch = claim(worker_id, batch_size)
+
+    outgoing, skipped = [], []
+    for message in batch:
+        appointment = message.appointment
+        if message.event == 'reminder':
+            if appointment.status not in OPEN_STATUSES or appointment.starts_at <= now:
+                skipped.append(message)
+                continue
+            if appointment.starts_at - timedelta(hours=24) > now:
+                # Rescheduled further out since the reminder was queued
+                message.available_at = appointment.starts_at - timedelta(hours=24)
+                continue
+        outgoing.append(message)
+
+    errors = sender.send([render(message) for message in outgoing]) if outgoing else []
+    for message, error in zip(outgoing, errors):
+        if error is None:
+            message.status, message.sent_at = 'sent', now
+            continue
+        message.attempts += 1
+        message.last_error = error
+        if message.attempts >= settings.REMINDER_MAX_ATTEMPTS:
+            message.status = 'failed'
+        else:
+            message.available_at = now + timedelta(seconds=settings.REMINDER_RETRY_BACKOFF * 2 ** message.attempts)
+    for message in skipped:
+        message.status = 'skipped'
+    for message in batch:
+        message.claimed_by, message.claimed_until = '', None
+
+    ReminderOutbox.objects.bulk_update(
+        batch, ['status', 'available_at', 'attempts', 'last_error', 'sent_at', 'claimed_by', 'claimed_until'])
+    return len(batch)
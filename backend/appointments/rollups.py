@@ -0,0 +1,62 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Appointment, AppointmentDailyRollup, ArchivedAppointment, RollupDirtyDay, RollupWatermark
+
+WATERMARK = 'appointment_daily'
+# Rows saved just before a run may commit after it starts; re-read this much history
+OVERLAP = timedelta(minutes=5)
+KEY_FIELDS = ('appointment_date', 'doctor', 'appointment_type', 'status')
+
+
+def changed_dates(since):
+    """Days holding an appointment saved after `since`"""
+    return set(
+        Appointment.objects.filter(updated_at__gt=since)
+        .values_list('appointment_date', flat=True).distinct().order_by()
+    )
+
+
+def rebuild_days(dates):
+    """Recompute the rollup rows for `dates` from live and archived appointments"""
+    dates = sorted(dates)
+    counts, minutes = Counter(), Counter()
+    for model in (Appointment, ArchivedAppointment):
+        grouped = (model.objects.filter(appointment_date__in=dates).values_list(*KEY_FIELDS)
+                   .annotate(n=Count('id'), m=Sum('duration')).order_by())
+        for *key, n, m in grouped:
+            counts[tuple(key)] += n
+            minutes[tuple(key)] += m or 0
+    rows = [
+        AppointmentDailyRollup(date=key[0], doctor_id=key[1], appointment_type=key[2], status=key[3],
+                               count=count, total_minutes=minutes[key])
+        for key, count in counts.items()
+    ]
+    with transaction.atomic():
+        AppointmentDailyRollup.objects.filter(date__in=dates).delete()
+        AppointmentDailyRollup.objects.bulk_create(rows)
+
+
+def refresh(full=False, chunk_days=31):
+    """Rebuild only the days touched since the last run, or every day when `full`. Returns the day count."""
+    started = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    # Days appointments were moved away from or deleted on; marks made during the run wait for the next one
+    dirty = dict(RollupDirtyDay.objects.values_list('id', 'date'))
+    if full or watermark is None:
+        dates = set(Appointment.objects.values_list('appointment_date', flat=True).distinct().order_by())
+        dates |= set(ArchivedAppointment.objects.values_list('appointment_date', flat=True).distinct().order_by())
+        # Days left without any appointment only have stale rollup rows
+        dates |= set(AppointmentDailyRollup.objects.values_list('date', flat=True).distinct().order_by())
+    else:
+        dates = changed_dates(watermark.refreshed_at - OVERLAP)
+    dates = sorted(dates | set(dirty.values()))
+    for i in range(0, len(dates), chunk_days):
+        rebuild_days(dates[i:i + chunk_days])
+    RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'refreshed_at': started})
+    RollupDirtyDay.objects.filter(id__in=list(dirty)).delete()
+    return len(dates)
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from hms_config import archival
+from hms_config.object_cache import invalidate_instance
+from hms_config.tracking import previous, track
+from .models import Appointment, RollupDirtyDay
+
+post_save.connect(invalidate_instance, sender=Appointment)
+post_delete.connect(invalidate_instance, sender=Appointment)
+
+track(Appointment, 'appointment_date')
+
+
+# The rollup refresh finds changed days through updated_at, which cannot
+# show the day an appointment was moved away from or deleted on
+
+@receiver(post_save, sender=Appointment)
+def mark_day_left(sender, instance, created, raw=False, **kwargs):
+    before = previous(instance)
+    if not raw and before and before['appointment_date'] != instance.appointment_date:
+        RollupDirtyDay.objects.create(date=before['appointment_date'])
+
+
+@receiver(post_delete, sender=Appointment)
+def mark_day_deleted(sender, instance, **kwargs):
+    # Archived appointments are still counted
+    if not archival.moving():
+        RollupDirtyDay.objects.create(date=instance.appointment_date)
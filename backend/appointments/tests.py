@@ -1,3 +1,348 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import time, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from hms_config.testing import clear_caches, client_for, make_patient, make_user
+from patients.models import ArchivedMedicalRecord, MedicalRecord, MedicalRecordText, Patient
+from .management.commands import loadtest
+from . import holds
+from .models import Appointment, AppointmentDailyRollup, ArchivedAppointment, ReminderOutbox
+from .reminders import claim, dispatch
+from .rollups import refresh as refresh_rollups
+from .serializers import AppointmentCreateSerializer
+
+
+def book(patient, doctor, day, at=time(10, 0), **fields):
+    return Appointment.objects.create(patient=patient, doctor=doctor, appointment_date=day,
+                                      appointment_time=at, reason='Check-up', **fields)
+
+
+class UpcomingAppointmentTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+        self.client = client_for(make_user('admin'))
+        today = timezone.localdate()
+        self.past = book(self.patient, self.doctor, today - timedelta(days=1))
+        self.future = book(self.patient, self.doctor, today + timedelta(days=1))
+
+    def test_upcoming_lists_only_future_open_appointments(self):
+        response = self.client.get('/api/appointments/upcoming/')
+        self.assertEqual([row['id'] for row in response.data], [self.future.pk])
+
+    def test_is_upcoming_is_annotated_on_detail(self):
+        self.assertFalse(self.client.get(f'/api/appointments/{self.past.pk}/').data['is_upcoming'])
+        self.assertTrue(self.client.get(f'/api/appointments/{self.future.pk}/').data['is_upcoming'])
+
+    def test_cancelling_clears_is_upcoming(self):
+        response = self.client.patch(f'/api/appointments/{self.future.pk}/', {'status': 'cancelled'}, format='json')
+        self.assertFalse(response.data['is_upcoming'])
+
+    def test_sweep_marks_past_due_appointments_as_no_show(self):
+        call_command('sweep_no_shows', '--batch-size', '1', stdout=StringIO())
+        self.past.refresh_from_db()
+        self.future.refresh_from_db()
+        self.assertEqual(self.past.status, 'no_show')
+        self.assertEqual(self.future.status, 'scheduled')
+
+
+class ArchiveHistoryTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+        self.client = client_for(make_user('admin'))
+        old = timezone.localdate() - timedelta(days=800)
+        self.old_closed = book(self.patient, self.doctor, old, status='completed')
+        self.old_open = book(self.patient, self.doctor, old, time(11, 0))
+        self.recent = book(self.patient, self.doctor, timezone.localdate(), status='completed')
+        self.old_record = MedicalRecord.objects.create(
+            patient=self.patient, doctor=self.doctor, visit_date=timezone.now() - timedelta(days=800),
+            diagnosis='Bronchitis', symptoms='Cough', notes='x' * 4000)
+        self.new_record = MedicalRecord.objects.create(
+            patient=self.patient, doctor=self.doctor, visit_date=timezone.now(), diagnosis='Flu', symptoms='Fever')
+
+    def archive(self):
+        call_command('archive_history', '--batch-size', '1', stdout=StringIO())
+
+    def test_moves_old_closed_rows_only(self):
+        self.archive()
+        self.assertEqual(set(Appointment.objects.values_list('pk', flat=True)), {self.old_open.pk, self.recent.pk})
+        self.assertEqual(ArchivedAppointment.objects.get().appointment_id, self.old_closed.appointment_id)
+        archived = ArchivedMedicalRecord.objects.get()
+        self.assertEqual((archived.pk, archived.diagnosis, archived.notes), (self.old_record.pk, 'Bronchitis', 'x' * 4000))
+        self.assertFalse(MedicalRecord.objects.filter(pk=self.old_record.pk).exists())
+
+    def test_archived_rows_are_listed_on_request(self):
+        self.archive()
+        url = f'/api/patients/{self.patient.pk}/appointments/'
+        self.assertEqual(len(self.client.get(url).data), 2)
+        self.assertEqual([row['id'] for row in self.client.get(url + '?include_archived=1').data],
+                         [self.old_closed.pk, self.old_open.pk, self.recent.pk])
+        records = self.client.get(f'/api/patients/{self.patient.pk}/medical_records/?include_archived=1').data
+        self.assertEqual([row['id'] for row in records], [self.new_record.pk, self.old_record.pk])
+
+    def test_record_without_text_row_is_archived_with_empty_text(self):
+        MedicalRecordText.objects.filter(record=self.old_record).delete()
+        self.archive()
+        self.assertEqual(ArchivedMedicalRecord.objects.get(pk=self.old_record.pk).diagnosis, '')
+
+    def test_rejected_row_stays_in_the_hot_table(self):
+        # An archived row already holding this appointment_id makes the copy fail
+        ArchivedAppointment.objects.create(
+            id=10 ** 9, appointment_id=self.old_closed.appointment_id, patient=self.patient, doctor=self.doctor,
+            appointment_date=self.old_closed.appointment_date, appointment_time=time(8, 0),
+            appointment_type='consultation', status='completed', reason='Old', created_at=timezone.now(),
+            updated_at=timezone.now())
+        with self.assertRaises(IntegrityError):
+            self.archive()
+        self.assertTrue(Appointment.objects.filter(pk=self.old_closed.pk).exists())
+
+
+class BookingConflictTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+        self.user = make_user('receptionist')
+        self.client = client_for(self.user)
+        self.day = timezone.localdate() + timedelta(days=5)
+        self.booking = {'patient': self.patient.pk, 'doctor': self.doctor.pk, 'appointment_date': self.day.isoformat(),
+                        'appointment_time': '10:00', 'reason': 'Check-up'}
+
+    def test_losing_the_race_for_a_slot_is_a_conflict(self):
+        book(make_patient(), self.doctor, self.day)
+        # As if the other booking committed after this one was validated
+        with mock.patch.object(AppointmentCreateSerializer, 'get_validators', return_value=[]):
+            response = self.client.post('/api/appointments/', self.booking, format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_other_integrity_errors_are_not_hidden(self):
+        with mock.patch.object(ReminderOutbox, 'enqueue', side_effect=IntegrityError('outbox')):
+            with self.assertRaises(IntegrityError):
+                self.client.post('/api/appointments/', self.booking, format='json')
+
+    def test_slots_held_by_others_cannot_be_booked(self):
+        holds.reserve(self.doctor.pk, self.day, time(10, 0), make_user('receptionist'))
+        self.assertEqual(self.client.post('/api/appointments/', self.booking, format='json').status_code, 409)
+
+    def test_impossible_dates_and_times_are_validation_errors(self):
+        for field, value in [('appointment_date', '2026-02-30'), ('appointment_time', '25:00')]:
+            response = self.client.post('/api/appointments/', {**self.booking, field: value}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.data)
+
+    def test_only_the_holder_releases_a_hold(self):
+        other = make_user('receptionist')
+        self.assertIsNotNone(holds.reserve(self.doctor.pk, self.day, time(10, 0), self.user))
+        self.assertIsNone(holds.reserve(self.doctor.pk, self.day, time(10, 0), other))
+        holds.release(self.doctor.pk, self.day, time(10, 0), other)
+        self.assertEqual(holds.holder(self.doctor.pk, self.day, time(10, 0)), self.user.pk)
+        holds.release(self.doctor.pk, self.day, time(10, 0), self.user)
+        self.assertIsNotNone(holds.reserve(self.doctor.pk, self.day, time(10, 0), other))
+
+    def test_holds_are_not_changed_while_locked(self):
+        holds.reserve(self.doctor.pk, self.day, time(10, 0), self.user)
+        cache.add(f'{holds._key(self.doctor.pk, self.day, time(10, 0))}:lock', True)
+        holds.release(self.doctor.pk, self.day, time(10, 0), self.user)
+        self.assertEqual(holds.holder(self.doctor.pk, self.day, time(10, 0)), self.user.pk)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.appointment = book(self.patient, self.doctor, self.day)
+        refresh_rollups()
+
+    def counts(self):
+        return dict(AppointmentDailyRollup.objects.values_list('date', 'count'))
+
+    def test_rescheduling_rebuilds_the_day_left_behind(self):
+        self.appointment.appointment_date = self.day + timedelta(days=1)
+        self.appointment.save()
+        refresh_rollups()
+        self.assertEqual(self.counts(), {self.day + timedelta(days=1): 1})
+
+    def test_deleting_rebuilds_its_day(self):
+        self.appointment.delete()
+        refresh_rollups()
+        self.assertEqual(self.counts(), {})
+
+    def test_full_refresh_clears_days_left_empty(self):
+        Appointment.objects.filter(pk=self.appointment.pk).update(appointment_date=self.day + timedelta(days=1))
+        refresh_rollups(full=True)
+        self.assertEqual(self.counts(), {self.day + timedelta(days=1): 1})
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_user('admin'))
+        self.doctor, self.other = make_user('doctor'), make_user('doctor')
+        self.day = timezone.localdate() - timedelta(days=2)
+        patient = make_patient()
+        for at, status in [(time(9), 'completed'), (time(10), 'completed'), (time(11), 'cancelled'),
+                           (time(12), 'no_show')]:
+            book(patient, self.doctor, self.day, at, status=status)
+        book(patient, self.other, self.day - timedelta(days=1), status='completed')
+        refresh_rollups()
+
+    def get(self, query='', client=None):
+        return (client or self.client).get(f'/api/analytics/{query}')
+
+    def test_totals_and_rates(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        totals = response.data['totals']
+        self.assertEqual((totals['appointments'], totals['completed'], totals['cancelled'], totals['no_show']),
+                         (5, 3, 1, 1))
+        self.assertEqual((totals['cancellation_rate'], totals['no_show_rate']), (0.2, 0.2))
+        self.assertEqual(totals['mean_daily_visits'], 3 / 30)
+        self.assertEqual([row['appointments'] for row in response.data['by_day']], [1, 4])
+
+    def test_date_range_and_doctor_filters(self):
+        response = self.get(f'?start={self.day}&end={self.day}')
+        self.assertEqual(response.data['totals']['appointments'], 4)
+        self.assertEqual(response.data['totals']['mean_daily_visits'], 2)
+        response = self.get(f'?doctor={self.other.pk}')
+        self.assertEqual([row['doctor'] for row in response.data['by_doctor']], [self.other.pk])
+        self.assertEqual(response.data['totals']['appointments'], 1)
+
+    def test_bad_parameters_are_rejected(self):
+        for query in ['?start=2026-13-01', '?end=2026-02-30', f'?start={self.day}&end={self.day - timedelta(days=1)}',
+                      '?doctor=me']:
+            self.assertEqual(self.get(query).status_code, 400, query)
+
+    def test_only_admins_see_analytics(self):
+        self.assertEqual(self.get(client=client_for(self.doctor)).status_code, 403)
+
+
+class FailingSender:
+    """Fails every message on the first call, then succeeds"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def send(self, messages):
+        self.calls += 1
+        return ['SMTP unavailable' if self.calls == 1 else None for _ in messages]
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ReminderOutboxTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+        self.client = client_for(make_user('admin'))
+
+    def create(self, day, at='10:00'):
+        response = self.client.post('/api/appointments/', {
+            'patient': self.patient.pk, 'doctor': self.doctor.pk,
+            'appointment_date': day.isoformat(), 'appointment_time': at, 'reason': 'Check-up',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Appointment.objects.get(appointment_date=day, appointment_time=at)
+
+    def test_booking_queues_a_reminder_due_a_day_before(self):
+        appointment = self.create(timezone.localdate() + timedelta(days=10))
+        message = ReminderOutbox.objects.get(appointment=appointment)
+        self.assertEqual(message.event, 'reminder')
+        self.assertEqual(message.available_at, appointment.starts_at - timedelta(hours=24))
+        self.assertEqual(dispatch(), 0)
+
+    def test_status_changes_are_sent_and_stale_reminders_skipped(self):
+        appointment = self.create(timezone.localdate() + timedelta(days=10))
+        self.client.post(f'/api/appointments/{appointment.pk}/cancel/')
+        self.assertEqual(dispatch(), 1)
+        self.assertEqual([message.subject for message in mail.outbox],
+                         [f'Your appointment {appointment.appointment_id} has been cancelled'])
+        ReminderOutbox.objects.filter(status='pending').update(available_at=timezone.now())
+        dispatch()
+        self.assertEqual(ReminderOutbox.objects.get(event='reminder').status, 'skipped')
+
+    def test_failed_sends_are_retried_with_backoff(self):
+        appointment = self.create(timezone.localdate() + timedelta(days=10))
+        self.client.post(f'/api/appointments/{appointment.pk}/confirm/')
+        sender = FailingSender()
+        dispatch(sender=sender)
+        message = ReminderOutbox.objects.get(event='confirmed')
+        self.assertEqual((message.status, message.attempts, message.last_error), ('pending', 1, 'SMTP unavailable'))
+        self.assertGreater(message.available_at, timezone.now())
+        ReminderOutbox.objects.filter(pk=message.pk).update(available_at=timezone.now())
+        dispatch(sender=sender)
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'sent')
+
+    def test_claimed_rows_are_not_claimed_twice(self):
+        appointment = self.create(timezone.localdate() + timedelta(days=10))
+        self.client.post(f'/api/appointments/{appointment.pk}/confirm/')
+        self.assertEqual(len(claim('worker-a', 10)), 1)
+        self.assertEqual(claim('worker-b', 10), [])
+
+
+class LoadtestReportTests(SimpleTestCase):
+    def setUp(self):
+        self.baseline = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'baseline.json'
+
+    def compare(self, p95, error_rate=0.0):
+        report = {'book': {'p95_ms': p95, 'error_rate': error_rate}}
+        loadtest.Command(stdout=StringIO()).compare(report, {
+            'baseline': str(self.baseline), 'save_baseline': False, 'max_regression': 0.25})
+
+    def test_percentile_picks_the_nearest_rank(self):
+        self.assertEqual(loadtest.percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(loadtest.percentile([5, 1, 4, 2, 3], 99), 5)
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+
+    def test_regressions_against_the_baseline_fail(self):
+        self.baseline.write_text(json.dumps({'book': {'p95_ms': 100, 'error_rate': 0.0}}))
+        self.compare(120)
+        with self.assertRaisesMessage(CommandError, 'book: p95'):
+            self.compare(130)
+        with self.assertRaisesMessage(CommandError, 'book: error rate'):
+            self.compare(100, error_rate=0.05)
+
+    def test_unknown_workflows_are_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', '--workflows', 'login,lunch', stdout=StringIO())
+
+
+@override_settings(AUTH_THROTTLE_BUCKETS={})
+class LoadtestRunTests(LiveServerTestCase):
+    def setUp(self):
+        clear_caches()
+        self.directory = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def test_seeded_workflows_run_against_the_server(self):
+        baseline = self.directory / 'baseline.json'
+        out = StringIO()
+        call_command('loadtest', '--seed', '--users', '2', '--duration', '1', '--base-url', self.live_server_url,
+                     '--workflows', 'nurse_shift,front_desk', '--baseline', str(baseline), '--save-baseline',
+                     stdout=out)
+        report = json.loads(baseline.read_text())
+        self.assertIn('book', report)
+        self.assertFalse([step for step, row in report.items() if any(s.startswith('5') for s in row['statuses'])])
+        self.assertEqual(Patient.all_objects.filter(email__startswith='loadtest-').count(), 10)
+
+    def test_seeding_twice_reuses_rows(self):
+        call_command('loadtest', '--seed', '--users', '1', '--duration', '0', '--base-url', self.live_server_url,
+                     '--baseline', str(self.directory / 'none.json'), stdout=StringIO())
+        Patient.objects.filter(email='loadtest-patient-0@example.com').deactivate()
+        call_command('loadtest', '--seed', '--users', '1', '--duration', '0', '--base-url', self.live_server_url,
+                     '--baseline', str(self.directory / 'none.json'), stdout=StringIO())
+        self.assertEqual(Patient.all_objects.filter(email__startswith='loadtest-').count(), 5)
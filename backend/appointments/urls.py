@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import AppointmentViewSet
+from .views import AppointmentViewSet, AnalyticsView
 
 router = DefaultRouter()
 router.register('appointments', AppointmentViewSet)
 
 urlpatterns = [
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
     path('', include(router.urls)),
 ]
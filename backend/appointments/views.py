@@ -1,13 +1,22 @@
 from rest_framework import viewsets, status, filters
+from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from hms_config.db_routers import ReplicaReadMixin
+from hms_config.idempotency import IdempotentCreateMixin
+from hms_config.object_cache import CachedRetrieveMixin
+from hms_config.write_queue import run_write
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from datetime import date
-from .models import Appointment
+from datetime import date, timedelta
+from django.db import IntegrityError
+from django.db.models import Q, Sum
+from django.utils.dateparse import parse_date, parse_time
+from . import holds
+from .models import Appointment, AppointmentDailyRollup, ReminderOutbox
 from .serializers import AppointmentSerializer, AppointmentListSerializer, AppointmentCreateSerializer
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(IdempotentCreateMixin, CachedRetrieveMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Appointment.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -23,8 +32,48 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return AppointmentListSerializer
         return AppointmentSerializer
     
+    def get_queryset(self):
+        return super().get_queryset().with_is_upcoming()
+    
+    def create(self, request, *args, **kwargs):
+        # Reject slots held by someone else before validation or any database work
+        try:
+            day = parse_date(str(request.data.get('appointment_date', '')))
+            at = parse_time(str(request.data.get('appointment_time', '')))
+        except ValueError:
+            # Well formed but impossible, e.g. February 30th; the serializer reports it
+            day = at = None
+        doctor = request.data.get('doctor')
+        if day and at and doctor:
+            held_by = holds.holder(doctor, day, at)
+            if held_by is not None and held_by != request.user.pk:
+                raise holds.SlotUnavailable('This slot is being booked by someone else.')
+        return super().create(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        def book():
+            appointment = serializer.save(created_by=self.request.user)
+            ReminderOutbox.enqueue(appointment, 'reminder')
+            return appointment
+        try:
+            appointment = run_write(book)
+        except IntegrityError:
+            # Losing a race for the slot after validation passed is a conflict; any other violation is a bug
+            data = serializer.validated_data
+            if Appointment.objects.occupying(data['doctor'].pk, data['appointment_date']).filter(
+                    appointment_time=data['appointment_time']).exists():
+                raise holds.SlotUnavailable()
+            raise
+        holds.release(appointment.doctor_id, appointment.appointment_date, appointment.appointment_time,
+                      self.request.user)
+    
+    def _set_status(self, appointment, new_status):
+        # The outbox row commits or rolls back together with the status change
+        def save():
+            appointment.status = new_status
+            appointment.save()
+            ReminderOutbox.enqueue(appointment, new_status)
+        run_write(save)
     
     @action(detail=False, methods=['get'])
     def today(self, request):
@@ -34,25 +83,20 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
-        upcoming_appointments = self.queryset.filter(
-            appointment_date__gte=date.today(),
-            status__in=['scheduled', 'confirmed']
-        )
+        upcoming_appointments = self.queryset.upcoming()
         serializer = AppointmentListSerializer(upcoming_appointments, many=True)
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         appointment = self.get_object()
-        appointment.status = 'confirmed'
-        appointment.save()
+        self._set_status(appointment, 'confirmed')
         return Response({'status': 'appointment confirmed'})
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         appointment = self.get_object()
-        appointment.status = 'cancelled'
-        appointment.save()
+        self._set_status(appointment, 'cancelled')
         return Response({'status': 'appointment cancelled'})
     
     @action(detail=False, methods=['get'], url_path='nurse-today')
@@ -68,3 +112,59 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         )
         serializer = self.get_serializer(appointments, many=True)
         return Response(serializer.data)
+
+
+def _rollup_totals(rows):
+    rows = list(rows)
+    for row in rows:
+        row['cancellation_rate'] = row['cancelled'] / row['appointments'] if row['appointments'] else 0
+        row['no_show_rate'] = row['no_show'] / row['appointments'] if row['appointments'] else 0
+    return rows
+
+
+class AnalyticsView(APIView):
+    """Appointment volume and outcome rates, answered from AppointmentDailyRollup only"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if request.user.role != 'admin' and not request.user.is_staff:
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            end = parse_date(request.query_params.get('end', '')) or date.today()
+            start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'start and end must be real dates'}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        rollups = AppointmentDailyRollup.objects.filter(date__range=(start, end))
+        doctor = request.query_params.get('doctor')
+        if doctor:
+            if not doctor.isdigit():
+                return Response({'error': 'doctor must be a user id'}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(doctor=doctor)
+        measures = {
+            'appointments': Sum('count'),
+            'completed': Sum('count', filter=Q(status='completed'), default=0),
+            'cancelled': Sum('count', filter=Q(status='cancelled'), default=0),
+            'no_show': Sum('count', filter=Q(status='no_show'), default=0),
+        }
+        
+        totals = rollups.aggregate(**measures)
+        totals['appointments'] = totals['appointments'] or 0
+        totals = _rollup_totals([totals])[0]
+        totals['mean_daily_visits'] = totals['completed'] / ((end - start).days + 1)
+        
+        return Response({
+            'start': start,
+            'end': end,
+            'totals': totals,
+            'by_day': _rollup_totals(rollups.values('date').annotate(**measures).order_by('date')),
+            'by_doctor': _rollup_totals(
+                rollups.values('doctor', 'doctor__first_name', 'doctor__last_name')
+                .annotate(**measures).order_by('doctor')
+            ),
+            'by_type': _rollup_totals(
+                rollups.values('appointment_type').annotate(**measures).order_by('appointment_type')
+            ),
+        })
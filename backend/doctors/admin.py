@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import Doctor
 
-# Register your models here.
+@admin.register(Doctor)
+class DoctorAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'specialty', 'department', 'work_start', 'work_end', 'slot_minutes', 'is_accepting_patients']
+    list_filter = ['specialty', 'department', 'is_accepting_patients']
+    list_select_related = ['user']
+    search_fields = ['user__first_name', 'user__last_name', 'specialty', 'department']
+    autocomplete_fields = ['user']
+    readonly_fields = ['slots_per_day', 'updated_at']
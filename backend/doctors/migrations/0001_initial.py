@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:00
+
+import datetime
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Doctor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialty', models.CharField(blank=True, max_length=100)),
+                ('department', models.CharField(blank=True, max_length=100)),
+                ('working_days', models.PositiveSmallIntegerField(default=31, help_text='Bitmask of working weekdays, Monday = 1')),
+                ('work_start', models.TimeField(default=datetime.time(9, 0))),
+                ('work_end', models.TimeField(default=datetime.time(17, 0))),
+                ('slot_minutes', models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5)])),
+                ('slots_per_day', models.PositiveSmallIntegerField(default=16, editable=False)),
+                ('is_accepting_patients', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(limit_choices_to={'role': 'doctor'}, on_delete=django.db.models.deletion.CASCADE, related_name='doctor_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user__last_name', 'user__first_name'],
+                'indexes': [models.Index(condition=models.Q(('is_accepting_patients', True)), fields=['specialty', 'working_days'], name='doctor_specialty_days_idx'), models.Index(condition=models.Q(('is_accepting_patients', True)), fields=['department', 'working_days'], name='doctor_department_days_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_profiles(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Doctor = apps.get_model('doctors', 'Doctor')
+    Doctor.objects.bulk_create([
+        Doctor(user_id=user_id)
+        for user_id in User.objects.filter(role='doctor', doctor_profile__isnull=True).values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_profiles, migrations.RunPython.noop),
+    ]
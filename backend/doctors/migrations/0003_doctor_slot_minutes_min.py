@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_backfill_doctor_profiles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='doctor',
+            constraint=models.CheckConstraint(condition=models.Q(('slot_minutes__gte', 5)), name='doctor_slot_minutes_min'),
+        ),
+    ]
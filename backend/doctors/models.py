@@ -1,3 +1,80 @@
+from datetime import datetime, time, timedelta
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import Count, F, Q
+from accounts.models import User
 
-# Create your models here.
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Every working_days bitmask that includes a given weekday, so "works on
+# day X" is an indexable IN lookup instead of a bitwise expression
+MASKS_BY_WEEKDAY = [
+    [mask for mask in range(1 << len(WEEKDAYS)) if mask & (1 << weekday)]
+    for weekday in range(len(WEEKDAYS))
+]
+
+
+class DoctorQuerySet(models.QuerySet):
+    def working_on(self, day):
+        return self.filter(working_days__in=MASKS_BY_WEEKDAY[day.weekday()])
+    
+    def available_on(self, day):
+        """Accepting doctors who work on `day` and still have an unbooked slot"""
+        # Same rule as AppointmentQuerySet.occupying(): cancelled rows still hold their slot.
+        # Meta.ordering is dropped from aggregate queries, so it is restated for pagination.
+        return self.working_on(day).filter(is_accepting_patients=True, user__is_active=True).annotate(
+            booked_slots=Count('user__doctor_appointments', filter=Q(
+                user__doctor_appointments__appointment_date=day,
+            )),
+        ).filter(booked_slots__lt=F('slots_per_day')).order_by(*Doctor._meta.ordering)
+
+
+class Doctor(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='doctor_profile', limit_choices_to={'role': 'doctor'})
+    specialty = models.CharField(max_length=100, blank=True)
+    department = models.CharField(max_length=100, blank=True)
+    
+    # Working hours
+    working_days = models.PositiveSmallIntegerField(default=0b0011111, help_text="Bitmask of working weekdays, Monday = 1")
+    work_start = models.TimeField(default=time(9))
+    work_end = models.TimeField(default=time(17))
+    slot_minutes = models.PositiveSmallIntegerField(default=30, validators=[MinValueValidator(5)])
+    slots_per_day = models.PositiveSmallIntegerField(default=16, editable=False)
+    is_accepting_patients = models.BooleanField(default=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = DoctorQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['user__last_name', 'user__first_name']
+        indexes = [
+            models.Index(fields=['specialty', 'working_days'], name='doctor_specialty_days_idx',
+                         condition=Q(is_accepting_patients=True)),
+            models.Index(fields=['department', 'working_days'], name='doctor_department_days_idx',
+                         condition=Q(is_accepting_patients=True)),
+        ]
+        # The validator only runs in full_clean(), not in save() or bulk_create()
+        constraints = [
+            models.CheckConstraint(condition=Q(slot_minutes__gte=5), name='doctor_slot_minutes_min'),
+        ]
+    
+    def __str__(self):
+        return f"Dr. {self.user.get_full_name() or self.user.username} ({self.specialty or 'General'})"
+    
+    def save(self, *args, **kwargs):
+        minutes = (datetime.combine(datetime.min, self.work_end) - datetime.combine(datetime.min, self.work_start)).total_seconds() // 60
+        # A zero slot length is left for the check constraint to reject
+        self.slots_per_day = max(0, int(minutes) // self.slot_minutes) if self.slot_minutes else 0
+        super().save(*args, **kwargs)
+    
+    def works_on(self, day):
+        return bool(self.working_days & (1 << day.weekday()))
+    
+    def slot_times(self):
+        start = datetime.combine(datetime.min, self.work_start)
+        return [(start + timedelta(minutes=self.slot_minutes * i)).time() for i in range(self.slots_per_day)]
+    
+    @property
+    def working_day_names(self):
+        return [name for weekday, name in enumerate(WEEKDAYS) if self.working_days & (1 << weekday)]
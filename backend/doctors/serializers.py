@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from .models import Doctor
+
+
+class DoctorSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    working_day_names = serializers.ReadOnlyField()
+    # Annotated by DoctorQuerySet.available_on()
+    booked_slots = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = Doctor
+        fields = ['id', 'user', 'username', 'first_name', 'last_name', 'specialty', 'department',
+                  'working_days', 'working_day_names', 'work_start', 'work_end', 'slot_minutes',
+                  'slots_per_day', 'booked_slots', 'is_accepting_patients']
+        read_only_fields = ['slots_per_day']
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from hms_config import archival
+from hms_config.tracking import previous, track
+from .models import Doctor
+from .views import bump_availability_cache, bump_search_cache
+
+track('appointments.Appointment', 'appointment_date')
+
+
+@receiver(post_save, sender=User)
+def create_doctor_profile(sender, instance, created, raw=False, **kwargs):
+    if created and instance.role == 'doctor' and not raw:
+        Doctor.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def invalidate_doctor_search(sender, **kwargs):
+    bump_search_cache()
+
+
+@receiver(post_save, sender='appointments.Appointment')
+@receiver(post_delete, sender='appointments.Appointment')
+def invalidate_doctor_availability(sender, instance, raw=False, **kwargs):
+    if raw or archival.moving():
+        return
+    before = previous(instance) or {}
+    # A rescheduled appointment frees a slot on the day it left
+    for day in {instance.appointment_date, before.get('appointment_date')} - {None}:
+        bump_availability_cache(day)
@@ -1,3 +1,93 @@
+from datetime import time, timedelta
+
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from hms_config.testing import clear_caches, client_for, make_patient, make_user
+from .models import Doctor
+
+
+def next_monday():
+    today = timezone.localdate()
+    return today + timedelta(days=7 - today.weekday())
+
+
+class DoctorAvailabilityTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = make_user('doctor')
+        self.doctor = self.user.doctor_profile
+        # Two slots a day: 09:00 and 09:30
+        self.doctor.work_end = time(10)
+        self.doctor.save()
+        self.day = next_monday()
+        self.client = client_for(make_user('patient'))
+
+    def book(self, at, **fields):
+        return Appointment.objects.create(patient=make_patient(), doctor=self.user, appointment_date=self.day,
+                                          appointment_time=at, reason='Check-up', **fields)
+
+    def slots(self):
+        return self.client.get(f'/api/doctors/{self.doctor.pk}/slots/?date={self.day}').data
+
+    def available(self):
+        rows = self.client.get(f'/api/doctors/?available_on={self.day}').data['results']
+        return [row['id'] for row in rows]
+
+    def test_slots_and_availability_agree_on_cancelled_appointments(self):
+        self.book(time(9), status='cancelled')
+        self.assertEqual(self.slots(), ['09:30'])
+        self.assertEqual(self.available(), [self.doctor.pk])
+        self.book(time(9, 30))
+        self.assertEqual(self.slots(), [])
+        self.assertEqual(self.available(), [])
+
+    def test_days_off_have_no_slots(self):
+        self.day += timedelta(days=5)
+        self.assertEqual(self.slots(), [])
+        self.assertEqual(self.available(), [])
+
+    def test_held_slots_are_hidden_from_others(self):
+        holder = client_for(make_user('patient'))
+        response = holder.post(f'/api/doctors/{self.doctor.pk}/hold/', {'date': self.day, 'time': '09:00'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.slots(), ['09:30'])
+        response = self.client.post(f'/api/doctors/{self.doctor.pk}/hold/', {'date': self.day, 'time': '09:00'})
+        self.assertEqual(response.status_code, 409)
+
+
+    def test_impossible_dates_and_times_are_validation_errors(self):
+        self.assertEqual(self.client.get(f'/api/doctors/{self.doctor.pk}/slots/?date=2026-02-30').status_code, 400)
+        response = self.client.post(f'/api/doctors/{self.doctor.pk}/hold/', {'date': self.day, 'time': '24:61'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('time', response.data)
+
+
+    def test_rescheduling_frees_the_cached_day(self):
+        appointment = self.book(time(9))
+        self.book(time(9, 30))
+        self.assertEqual(self.available(), [])
+        appointment.appointment_date += timedelta(days=7)
+        appointment.save()
+        self.assertEqual(self.available(), [self.doctor.pk])
+
+    def test_impossible_availability_dates_are_rejected(self):
+        self.assertEqual(self.client.get('/api/doctors/?available_on=2026-02-30').status_code, 400)
+
+
+class DoctorProfileTests(TestCase):
+    def test_profile_is_created_with_the_user_only(self):
+        user = make_user('doctor')
+        self.assertTrue(Doctor.objects.filter(user=user).exists())
+        Doctor.objects.filter(user=user).delete()
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertFalse(Doctor.objects.filter(user=user).exists())
 
-# Create your tests here.
+    def test_zero_length_slots_are_rejected_by_the_database(self):
+        doctor = make_user('doctor').doctor_profile
+        doctor.slot_minutes = 0
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            doctor.save()
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import DoctorViewSet
+
+router = DefaultRouter()
+router.register('doctors', DoctorViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -1,3 +1,139 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_date, parse_time
+from django.utils.http import urlencode
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from appointments import holds
+from appointments.models import Appointment
+from .models import Doctor
+from .serializers import DoctorSerializer
 
-# Create your views here.
+CACHE_VERSION_KEY = 'doctors:search-version'
+
+
+def _day_version_key(day):
+    return f'doctors:availability-version:{day.isoformat()}'
+
+
+def bump_search_cache():
+    """Invalidate every cached doctor search"""
+    if not cache.add(CACHE_VERSION_KEY, 2):
+        cache.incr(CACHE_VERSION_KEY)
+
+
+def bump_availability_cache(day):
+    """Invalidate the cached `available_on` searches for `day`"""
+    key = _day_version_key(day)
+    if not cache.add(key, 2):
+        cache.incr(key)
+
+
+def _parse(parser, value):
+    """`parser(value)`, with impossible dates and times such as 2026-02-30 treated as malformed"""
+    try:
+        return parser(str(value))
+    except ValueError:
+        return None
+
+
+class DoctorPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class DoctorViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Doctor directory.
+
+    `?available_on=YYYY-MM-DD` narrows it to doctors working that day with a
+    free slot. List responses are cached for DOCTOR_SEARCH_CACHE_SECONDS.
+    `slots/` lists a day's bookable times and `hold/` reserves one of them
+    for SLOT_HOLD_SECONDS while the user fills in the booking.
+    """
+    queryset = Doctor.objects.select_related('user').filter(user__is_active=True)
+    serializer_class = DoctorSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = DoctorPagination
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['specialty', 'department', 'is_accepting_patients']
+    search_fields = ['user__first_name', 'user__last_name', 'specialty', 'department']
+    ordering_fields = ['user__last_name', 'specialty', 'department']
+    
+    def _available_on(self):
+        available_on = self.request.query_params.get('available_on')
+        if not available_on:
+            return None
+        day = _parse(parse_date, available_on)
+        if day is None:
+            raise ValidationError({'available_on': 'Use the YYYY-MM-DD format.'})
+        return day
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        day = self._available_on()
+        if day is not None:
+            queryset = queryset.available_on(day)
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        version = cache.get_or_set(CACHE_VERSION_KEY, 1)
+        # Availability also changes with every booking, so it is versioned per day as well
+        day = self._available_on()
+        if day is not None:
+            version = f'{version}.{cache.get_or_set(_day_version_key(day), 1)}'
+        key = f"doctors:search:{version}:{urlencode(sorted(request.query_params.lists()), doseq=True)}"
+        data = cache.get(key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(key, data, settings.DOCTOR_SEARCH_CACHE_SECONDS)
+        return Response(data)
+    
+    def _slot_params(self, params, with_time=True):
+        day = _parse(parse_date, params.get('date', ''))
+        if day is None:
+            raise ValidationError({'date': 'Use the YYYY-MM-DD format.'})
+        if not with_time:
+            return day, None
+        at = _parse(parse_time, params.get('time', ''))
+        if at is None:
+            raise ValidationError({'time': 'Use the HH:MM format.'})
+        return day, at
+    
+    @action(detail=True, methods=['get'])
+    def slots(self, request, pk=None):
+        """Free times on `?date=`, leaving out booked slots and slots other users hold"""
+        doctor = self.get_object()
+        day, _ = self._slot_params(request.query_params, with_time=False)
+        if not doctor.works_on(day) or not doctor.is_accepting_patients:
+            return Response([])
+        times = doctor.slot_times()
+        booked = set(Appointment.objects.occupying(doctor.user_id, day).values_list('appointment_time', flat=True))
+        held = holds.held_by_others(doctor.user_id, day, times, request.user)
+        return Response([at.strftime('%H:%M') for at in times if at not in booked and at not in held])
+    
+    @action(detail=True, methods=['post', 'delete'])
+    def hold(self, request, pk=None):
+        doctor = self.get_object()
+        if request.method == 'DELETE':
+            day, at = self._slot_params(request.query_params)
+            holds.release(doctor.user_id, day, at, request.user)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        day, at = self._slot_params(request.data)
+        if not doctor.works_on(day) or at not in doctor.slot_times():
+            raise ValidationError({'time': 'Not one of this doctor\'s slots.'})
+        expires_at = holds.reserve(doctor.user_id, day, at, request.user)
+        if expires_at is None:
+            raise holds.SlotUnavailable('This slot is being booked by someone else.')
+        if Appointment.objects.occupying(doctor.user_id, day).filter(appointment_time=at).exists():
+            holds.release(doctor.user_id, day, at, request.user)
+            raise holds.SlotUnavailable()
+        return Response({'date': day, 'time': at.strftime('%H:%M'), 'expires_at': expires_at},
+                        status=status.HTTP_201_CREATED)
@@ -0,0 +1,48 @@
+from contextvars import ContextVar
+
+from django.db import transaction
+
+_moving = ContextVar('archival_moving', default=False)
+
+
+def moving():
+    """True while archived rows leave the hot table; post_delete receivers should treat them as moved, not gone"""
+    return _moving.get()
+
+
+def archive_in_batches(queryset, archive_model, batch_size, sources=None):
+    """
+    Move the rows matching `queryset` into `archive_model`, oldest id first.
+
+    Every batch copies and deletes inside one transaction, so an interrupted
+    run leaves no half-moved rows and simply resumes on the next call.
+    `sources` maps archive fields to lookups on `queryset` for values that
+    live elsewhere, e.g. {'notes': 'clinical_text__notes'}; a missing
+    related row reads as the archive field's default. A row the archive
+    rejects aborts the batch instead of being deleted unarchived.
+    Yields the number of rows moved per batch.
+    """
+    sources = sources or {}
+    fields = [f for f in archive_model._meta.concrete_fields if f.name != 'archived_at']
+    lookups = [sources.get(f.attname, f.attname) for f in fields]
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.order_by('pk').values_list(*lookups)[:batch_size])
+            if not rows:
+                return
+            copies = [
+                archive_model(**{
+                    f.attname: f.get_default() if value is None and f.attname in sources and not f.null else value
+                    for f, value in zip(fields, row)
+                })
+                for row in rows
+            ]
+            archive_model.objects.bulk_create(copies)
+            # Only ids now present in the archive leave the hot table
+            archived = archive_model.objects.filter(pk__in=[copy.pk for copy in copies]).values_list('pk', flat=True)
+            token = _moving.set(True)
+            try:
+                queryset.model.objects.filter(pk__in=list(archived)).delete()
+            finally:
+                _moving.reset(token)
+        yield len(rows)
@@ -0,0 +1,83 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def _pin_key(user):
+    return f'db-pin:{user.pk}'
+
+
+class ReplicaRouter:
+    """Send reads to a replica only while a ReplicaReadMixin view has opted in"""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            replicas = replica_aliases()
+            if replicas:
+                return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror default, so objects from any alias can be related
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary through replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a user who has just written to the primary for REPLICA_PIN_SECONDS.
+
+    Runs for every view, including the admin and accounts endpoints, so the
+    user's next replica-routed read always sees their own write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the user it authenticated back onto the Django request
+        user = getattr(request, 'user', None)
+        if (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated and replica_aliases()):
+            cache.set(_pin_key(user), True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Route safe-method requests to the read replicas.
+
+    Users pinned by ReplicaPinMiddleware keep reading from the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = request.user
+        pinned = user.is_authenticated and cache.get(_pin_key(user))
+        if request.method in SAFE_METHODS and not pinned and replica_aliases():
+            self._replica_token = _read_from_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_from_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
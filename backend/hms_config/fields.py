@@ -0,0 +1,64 @@
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+_PLAIN = b'\x00'
+_ZLIB = b'\x01'
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored as bytes, zlib-compressed once it is longer than
+    CLINICAL_TEXT_COMPRESS_BYTES. Reads always return str.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        # BinaryField drops editable=True; keep the migration state in line with __init__
+        kwargs.pop('editable', None)
+        if kwargs.get('default') == '':
+            del kwargs['default']
+        return name, path, args, kwargs
+
+    def _check_str_default_value(self):
+        # The default is text; it is encoded on the way to the database
+        return []
+
+    @staticmethod
+    def decode(value):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        if value[:1] == _ZLIB:
+            return zlib.decompress(value[1:]).decode()
+        return value[1:].decode()
+
+    @staticmethod
+    def encode(value):
+        data = (value or '').encode()
+        if len(data) > settings.CLINICAL_TEXT_COMPRESS_BYTES:
+            return _ZLIB + zlib.compress(data)
+        return _PLAIN + data
+
+    def from_db_value(self, value, expression, connection):
+        return self.decode(value)
+
+    def to_python(self, value):
+        return self.decode(value)
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return self.encode(value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return models.TextField().formfield(**{'required': not self.blank, **kwargs})
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+# Upper bound on how long a crashed request keeps its key locked
+LOCK_SECONDS = 60
+
+
+def _cache_key(request, key):
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    digest = hashlib.sha256(f'{user}:{request.path}:{key}'.encode()).hexdigest()
+    return f'idempotency:{digest}'
+
+
+def _fingerprint(request):
+    return hashlib.sha256(json.dumps(request.data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response({'error': f'{HEADER} was already used with a different request body'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotentCreateMixin:
+    """
+    Honour an Idempotency-Key header on create.
+
+    The first response is kept in the shared cache for IDEMPOTENCY_TTL and
+    replayed for repeats of the same key by the same user, without running
+    validation or the insert again. A repeat that arrives while the first
+    request is still running waits up to IDEMPOTENCY_WAIT seconds for its
+    result and otherwise gets a 409; a body that differs from the first
+    one gets a 422.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        cache_key = _cache_key(request, key)
+        lock_key = f'{cache_key}:lock'
+        fingerprint = _fingerprint(request)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            # cache.add is atomic, so only one request per key does the work at a time
+            if cache.add(lock_key, True, LOCK_SECONDS):
+                break
+            if time.monotonic() >= deadline:
+                return Response({'error': f'A request with this {HEADER} is still in progress'},
+                                status=status.HTTP_409_CONFLICT)
+            time.sleep(0.05)
+
+        try:
+            response = super().create(request, *args, **kwargs)
+            # Validation errors raise and are not stored, so a corrected retry can reuse the key
+            if response.status_code < 500:
+                cache.set(cache_key, {
+                    'status': response.status_code,
+                    'data': response.data,
+                    'fingerprint': fingerprint,
+                }, settings.IDEMPOTENCY_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
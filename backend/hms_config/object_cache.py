@@ -0,0 +1,70 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _cache():
+    return caches['objects']
+
+
+def _version_key(model, pk):
+    return f'obj-version:{model._meta.label_lower}:{pk}'
+
+
+def current_version(model, pk):
+    """Opaque version token of one object, created on first use"""
+    key = _version_key(model, pk)
+    cache = _cache()
+    # Versions expire with OBJECT_CACHE_TTL so time-dependent fields (age, is_upcoming) are recomputed
+    cache.add(key, uuid.uuid4().hex, settings.OBJECT_CACHE_TTL)
+    return cache.get(key)
+
+
+def invalidate(model, pks):
+    """Drop the cached detail responses of `pks`; needed after queryset.update(), which sends no signals"""
+    _cache().delete_many([_version_key(model, pk) for pk in pks])
+
+
+def invalidate_instance(sender, instance, raw=False, **kwargs):
+    """post_save/post_delete receiver"""
+    if not raw:
+        invalidate(sender, [instance.pk])
+
+
+class CachedRetrieveMixin:
+    """
+    Serve retrieve() from a per-object cache of the serialized response.
+
+    Entries are keyed by (model, pk, version); saving or deleting the object
+    replaces its version, so stale payloads are never read, only evicted by
+    the LRU 'objects' cache. The version doubles as a strong ETag and a
+    matching If-None-Match gets a 304 without touching the database.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.query_params:
+            # Query parameters can change the payload or visibility
+            return super().retrieve(request, *args, **kwargs)
+        model = self.queryset.model
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        version = current_version(model, pk)
+        etag = f'"{version}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+        data_key = f'obj:{model._meta.label_lower}:{pk}:{version}'
+        data = _cache().get(data_key)
+        if data is None:
+            response = super().retrieve(request, *args, **kwargs)
+            _cache().set(data_key, response.data, settings.OBJECT_CACHE_TTL)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        # Let browsers keep the payload but revalidate it on every use
+        response['Cache-Control'] = 'private, no-cache'
+        return response
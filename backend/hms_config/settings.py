@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -64,6 +65,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hms_config.db_routers.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,6 +77,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'ETag']
 
 # REST Framework Settings
 REST_FRAMEWORK = {
@@ -89,8 +93,40 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Reverse proxies in front of the app; client IPs come from X-Forwarded-For only behind
+    # that many, otherwise REMOTE_ADDR, so clients cannot pick their own throttle bucket
+    'NUM_PROXIES': int(os.environ.get('HMS_NUM_PROXIES', 0)),
 }
 
+# Shared cache for throttling and response caches; point HMS_CACHE_BACKEND at
+# Redis or Memcached when running more than one process
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('HMS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('HMS_CACHE_LOCATION', ''),
+    },
+    # Serialized detail responses (hms_config.object_cache); locmem culls least recently used entries
+    'objects': {
+        'BACKEND': os.environ.get('HMS_OBJECT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('HMS_OBJECT_CACHE_LOCATION', 'objects'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('HMS_OBJECT_CACHE_MAX_ENTRIES', 5000))},
+    },
+}
+OBJECT_CACHE_TTL = 60
+
+# Token buckets for the unauthenticated auth endpoints: (burst size, tokens refilled per minute)
+AUTH_THROTTLE_BUCKETS = {
+    'login_ip': (30, 10),
+    'login_username': (5, 2),
+    'refresh_ip': (60, 30),
+    'signup_ip': (5, 1),
+    'signup_email': (3, 1),
+    'register_username': (3, 1),
+}
+if os.environ.get('HMS_AUTH_THROTTLE', '1') == '0':
+    # Capacity load tests log many users in from one address
+    AUTH_THROTTLE_BUCKETS = {}
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -124,13 +160,61 @@ WSGI_APPLICATION = 'hms_config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite engine profile: "default" is Django's stock behaviour; the opt-in "concurrent"
+# turns on WAL, relaxed fsync, a busy timeout and BEGIN IMMEDIATE write transactions.
+SQLITE_PROFILE = os.environ.get('HMS_SQLITE_PROFILE', 'default')
+
+SQLITE_OPTIONS = {}
+if SQLITE_PROFILE == 'concurrent':
+    SQLITE_OPTIONS = {
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA busy_timeout=20000;'
+            'PRAGMA mmap_size=134217728;'
+            'PRAGMA cache_size=-20000;'
+        ),
+    }
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('HMS_SQLITE_NAME', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': SQLITE_OPTIONS,
     }
 }
 
+# Read replicas: comma-separated SQLite files standing in for replicas locally,
+# e.g. HMS_READ_REPLICAS=replica.sqlite3
+for index, replica_name in enumerate(filter(None, os.environ.get('HMS_READ_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / replica_name.strip(),
+        'OPTIONS': SQLITE_OPTIONS,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['hms_config.db_routers.ReplicaRouter']
+
+# Seconds a user keeps reading from the primary after their own write
+REPLICA_PIN_SECONDS = 5
+
+# Funnel booking writes through one in-process writer thread that commits
+# up to SQLITE_WRITE_QUEUE_BATCH queued writes per transaction
+SQLITE_WRITE_QUEUE = os.environ.get('HMS_SQLITE_WRITE_QUEUE') == '1'
+SQLITE_WRITE_QUEUE_BATCH = 50
+# Seconds a request waits for its queued write before giving up with a 503
+SQLITE_WRITE_QUEUE_TIMEOUT = 30
+
+# Appointment notifications, dispatched from the outbox by `manage.py dispatch_reminders`
+EMAIL_BACKEND = os.environ.get('HMS_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = 'noreply@hms.local'
+REMINDER_SENDER = 'appointments.reminders.EmailSender'
+REMINDER_MAX_ATTEMPTS = 5
+REMINDER_RETRY_BACKOFF = 30  # seconds, doubled on every failed attempt
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -168,6 +252,40 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Square profile picture sizes generated on upload, in pixels
+AVATAR_VARIANTS = {
+    'small': 48,
+    'medium': 128,
+    'large': 256,
+}
+AVATAR_VARIANTS_ASYNC = True
+
+DOCTOR_SEARCH_CACHE_SECONDS = 60
+
+# Clinical free text longer than this many bytes is stored zlib-compressed
+CLINICAL_TEXT_COMPRESS_BYTES = 1024
+
+# Minimum patients.duplicates score for two records to be flagged as the same person
+DUPLICATE_PATIENT_THRESHOLD = 0.7
+
+# How long a reserved appointment slot stays held for the user booking it
+SLOT_HOLD_SECONDS = 120
+
+# Responses to POSTs carrying an Idempotency-Key are replayed for this long
+IDEMPOTENCY_TTL = 24 * 60 * 60
+# How long a duplicate waits for the in-flight original before getting a 409
+IDEMPOTENCY_WAIT = 5
+
+# Local start times of nurse shifts; precompute_handover builds reports shortly before each
+NURSE_SHIFT_STARTS = os.environ.get('HMS_NURSE_SHIFT_STARTS', '07:00,19:00').split(',')
+# How long a precomputed handover report is served before it is rebuilt on request
+HANDOVER_CACHE_SECONDS = 45 * 60
+# Nurse assignment changes younger than this appear in the handover report
+HANDOVER_ASSIGNMENT_HOURS = 24
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,40 @@
+from datetime import date
+from itertools import count
+
+from django.core.cache import caches
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from patients.models import Patient
+
+_sequence = count(1)
+
+
+def make_user(role='doctor', **fields):
+    n = next(_sequence)
+    fields.setdefault('username', f'{role}{n}')
+    return User.objects.create_user(password='Test-pass-123', role=role, **fields)
+
+
+def make_patient(**fields):
+    n = next(_sequence)
+    defaults = {
+        'first_name': f'Given{n}', 'last_name': f'Family{n}', 'date_of_birth': date(1980, 1, 1),
+        'gender': 'male', 'blood_group': 'A+', 'email': f'patient{n}@example.com',
+        'phone': f'555-01{n:04d}', 'address': '1 Main St', 'city': 'Springfield', 'state': 'IL',
+        'zip_code': '62701', 'emergency_contact_name': 'Contact', 'emergency_contact_phone': '555-0100',
+        'emergency_contact_relation': 'Sibling',
+    }
+    return Patient.objects.create(**{**defaults, **fields})
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def clear_caches():
+    """Throttle buckets, holds and cached responses live in locmem caches that outlive each test"""
+    for alias in ('default', 'objects'):
+        caches[alias].clear()
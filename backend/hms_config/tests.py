@@ -0,0 +1,231 @@
+import threading
+import warnings
+from concurrent.futures import Future
+from datetime import date, datetime, time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appointments.models import Appointment
+from patients.models import MedicalRecord, Patient
+from nurse_tasks.models import NurseTask
+from . import db_routers
+from .idempotency import _cache_key
+from .testing import clear_caches, client_for, make_patient, make_user
+from .write_queue import WriteQueue, WriterUnavailable, run_write
+
+# Only the alias names matter to the router; no connection to the replica is ever opened
+WITH_REPLICA = {**settings.DATABASES, 'replica_1': settings.DATABASES['default']}
+warnings.filterwarnings('ignore', 'Overriding setting DATABASES', UserWarning)
+
+
+@override_settings(DATABASES=WITH_REPLICA)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.nurse = make_user('nurse')
+        self.client = client_for(self.nurse)
+        self.routed = []
+        route = db_routers.ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            # Record the decision but keep every query on the test database
+            self.routed.append(route(router, model, **hints))
+            return 'default'
+
+        patcher = mock.patch.object(db_routers.ReplicaRouter, 'db_for_read', spy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_safe_viewset_reads_go_to_a_replica(self):
+        self.client.get('/api/patients/')
+        self.assertIn('replica_1', self.routed)
+        self.assertFalse(db_routers._read_from_replica.get())
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        response = self.client.post('/api/nurse-tasks/tasks/', {
+            'nurse': self.nurse.pk, 'patient': make_patient().pk, 'title': 'Obs', 'scheduled_time': '10:00',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.routed.clear()
+        self.client.get('/api/patients/')
+        self.assertNotIn('replica_1', self.routed)
+
+    def test_writes_outside_replica_views_pin_too(self):
+        response = self.client.patch('/api/auth/profile/', {'first_name': 'Ann'}, format='json')
+        self.assertLess(response.status_code, 400, response.content)
+        self.assertTrue(cache.get(db_routers._pin_key(self.nurse)))
+
+    def test_replicas_are_never_migrated(self):
+        router = db_routers.ReplicaRouter()
+        self.assertIs(router.allow_migrate('replica_1', 'patients'), False)
+        self.assertIsNone(router.allow_migrate('default', 'patients'))
+
+
+class WriteQueueTests(TestCase):
+    def setUp(self):
+        self.writes = WriteQueue(batch_size=10)
+
+    def test_results_come_back_to_each_caller(self):
+        futures = [self.writes.submit(lambda n=n: n * 2) for n in range(5)]
+        self.assertEqual([self.writes.wait(future, 5) for future in futures], [0, 2, 4, 6, 8])
+
+    def test_a_failing_write_only_fails_its_own_caller(self):
+        def fail():
+            raise ValueError('bad row')
+        failed, ok = self.writes.submit(fail), self.writes.submit(lambda: 'ok')
+        with self.assertRaises(ValueError):
+            self.writes.wait(failed, 5)
+        self.assertEqual(self.writes.wait(ok, 5), 'ok')
+
+    def test_waiting_gives_up_after_the_timeout(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        stuck = self.writes.submit(release.wait)
+        with self.assertRaises(WriterUnavailable):
+            self.writes.wait(stuck, 0.2)
+
+    def test_waiting_stops_when_the_writer_thread_is_gone(self):
+        self.writes._thread = threading.Thread(target=lambda: None)
+        self.writes._thread.start()
+        self.writes._thread.join()
+        with self.assertRaises(WriterUnavailable):
+            self.writes.wait(Future(), 60)
+
+    def test_run_write_runs_inline_when_the_queue_is_off(self):
+        self.assertEqual(run_write(lambda: threading.current_thread()), threading.current_thread())
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client.force_login(make_user('admin', is_staff=True, is_superuser=True))
+        self.doctor = make_user('doctor')
+        self.patient = make_patient()
+
+    def book(self, years):
+        for year in years:
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_date=date(year, 3, 1),
+                                       appointment_time=time(10, 0), reason='Check-up')
+
+    def changelist(self, query=''):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/admin/appointments/appointment/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries]
+
+    def test_date_choices_do_not_scan_distinct_dates(self):
+        self.book([2020])
+        _, few = self.changelist()
+        self.book(range(2000, 2020))
+        response, many = self.changelist()
+        self.assertEqual(len(few), len(many))
+        self.assertFalse([sql for sql in many if 'DISTINCT' in sql])
+        self.assertContains(response, '?appointment_date__period=2000')
+
+    def test_drilling_into_a_year_lists_its_months_and_filters(self):
+        self.book([2019, 2020])
+        response, _ = self.changelist('?appointment_date__period=2020')
+        self.assertContains(response, '?appointment_date__period=2020-03')
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        response, _ = self.changelist('?appointment_date__period=2020-04')
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_datetime_fields_drill_down_too(self):
+        MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, diagnosis='Flu', symptoms='Fever',
+                                     visit_date=timezone.make_aware(datetime(2021, 12, 31, 23, 30)))
+        response = self.client.get('/admin/patients/medicalrecord/?visit_date__period=2021-12')
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+        response = self.client.get('/admin/patients/medicalrecord/?visit_date__period=2022')
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_medical_records_are_searchable_by_diagnosis(self):
+        flu, _ = [MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, diagnosis=diagnosis,
+                                               symptoms='', visit_date=timezone.now())
+                  for diagnosis in ('Seasonal influenza', 'Sprained ankle')]
+        response = self.client.get('/admin/patients/medicalrecord/?q=INFLUENZA')
+        self.assertEqual(list(response.context['cl'].result_list), [flu])
+        response = self.client.get(f'/admin/patients/medicalrecord/?q={self.patient.last_name}')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+
+    def test_patient_admin_lists_deactivated_patients(self):
+        Patient.objects.filter(pk=self.patient.pk).deactivate()
+        response = self.client.get('/admin/patients/patient/')
+        self.assertEqual(list(response.context['cl'].result_list), [self.patient])
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.nurse = make_user('nurse')
+        self.client = client_for(self.nurse)
+        self.task = {'nurse': self.nurse.pk, 'patient': make_patient().pk, 'title': 'Obs', 'scheduled_time': '10:00'}
+
+    def post(self, body, key='abc', client=None):
+        return (client or self.client).post('/api/nurse-tasks/tasks/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeats_replay_the_first_response(self):
+        first = self.post(self.task)
+        repeat = self.post(self.task)
+        self.assertEqual((repeat.status_code, repeat.data), (201, first.data))
+        self.assertEqual(repeat['Idempotent-Replayed'], 'true')
+        self.assertEqual(NurseTask.objects.count(), 1)
+
+    def test_a_different_body_is_rejected(self):
+        self.post(self.task)
+        self.assertEqual(self.post({**self.task, 'title': 'Meds'}).status_code, 422)
+
+    def test_keys_are_per_user(self):
+        self.post(self.task)
+        other = make_user('nurse')
+        response = self.post({**self.task, 'nurse': other.pk}, client=client_for(other))
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(NurseTask.objects.count(), 2)
+
+    def test_validation_errors_are_not_kept(self):
+        self.assertEqual(self.post({**self.task, 'title': ''}).status_code, 400)
+        self.assertEqual(self.post(self.task).status_code, 201)
+
+    @override_settings(IDEMPOTENCY_WAIT=0.1)
+    def test_a_repeat_during_the_first_request_conflicts(self):
+        request = mock.Mock(path='/api/nurse-tasks/tasks/', user=self.nurse)
+        cache.add(f'{_cache_key(request, "abc")}:lock', True)
+        self.assertEqual(self.post(self.task).status_code, 409)
+        self.assertFalse(NurseTask.objects.exists())
+
+
+class ObjectCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_user('admin'))
+        self.patient = make_patient()
+        self.url = f'/api/patients/{self.patient.pk}/'
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            repeat = self.client.get(self.url)
+        self.assertEqual(repeat.data, first.data)
+        self.assertEqual(repeat['ETag'], first['ETag'])
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_writes_replace_the_cached_payload(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(self.url, {'city': 'Shelbyville', 'allergies': 'Penicillin'}, format='json')
+        response = self.client.get(self.url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual((response.data['city'], response.data['allergies']), ('Shelbyville', 'Penicillin'))
+
+    def test_bulk_updates_invalidate_too(self):
+        self.client.get(self.url)
+        Patient.objects.filter(pk=self.patient.pk).deactivate()
+        self.assertFalse(self.client.get(self.url + '?include_inactive=1').data['is_active'])
+        self.assertEqual(self.client.get(self.url).status_code, 404)
@@ -0,0 +1,30 @@
+from collections import defaultdict
+
+from django.db.models.signals import pre_save
+
+_fields = defaultdict(set)
+
+
+def track(model, *fields):
+    """
+    Make the stored values of `fields` available to post_save receivers of `model`.
+
+    Before an update the row is read back with one primary key query, so the
+    values are exact however long ago the instance was loaded. Inserts cost
+    nothing. `model` may be a model class or an 'app_label.Model' string.
+    """
+    label = model if isinstance(model, str) else model._meta.label
+    _fields[label].update(fields)
+    pre_save.connect(_remember, sender=model, dispatch_uid=f'tracking:{label}')
+
+
+def _remember(sender, instance, raw=False, using=None, **kwargs):
+    instance._stored_values = None
+    if not raw and not instance._state.adding and instance.pk is not None:
+        instance._stored_values = (sender._base_manager.using(using).filter(pk=instance.pk)
+                                   .values(*_fields[sender._meta.label]).first())
+
+
+def previous(instance):
+    """The tracked values as stored before the current save, or None for inserts and unknown rows"""
+    return instance.__dict__.get('_stored_values')
@@ -2,15 +2,25 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from accounts.avatars import VARIANT_DIR
+from accounts.views import profile_picture_variant
+from nurse_tasks.views import NurseHandoverView, NurseRoundView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('accounts.urls')),
     path('api/', include('patients.urls')),
     path('api/', include('appointments.urls')),
+    path('api/', include('doctors.urls')),
     path('api/nurse-tasks/', include('nurse_tasks.urls')),
+    path('api/nurse/handover/', NurseHandoverView.as_view(), name='nurse-handover'),
+    path('api/nurse/rounds/', NurseRoundView.as_view(), name='nurse-rounds'),
     path('api/accounts/', include('accounts.urls')),
 ]
 
 if settings.DEBUG:
+    # In production the web server serves these with the same Cache-Control header
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.strip('/')}/{VARIANT_DIR}/<path:path>", profile_picture_variant),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
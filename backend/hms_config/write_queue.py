@@ -0,0 +1,111 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import APIException
+
+# How often a waiting request checks that the writer thread is still alive
+POLL_SECONDS = 0.5
+
+
+class WriterUnavailable(APIException):
+    status_code = 503
+    default_detail = 'The database writer is not responding. Please retry.'
+    default_code = 'writer_unavailable'
+
+
+class WriteQueue:
+    """
+    Single writer thread that coalesces small writes.
+
+    Queued callables run one after another, each in its own savepoint, and
+    up to `batch_size` of them share a single commit. A failing callable
+    only rolls back its own savepoint.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, fn):
+        future = Future()
+        self._ensure_started()
+        self._queue.put((fn, future))
+        return future
+
+    def wait(self, future, timeout):
+        """
+        Result of `future`, raising WriterUnavailable if the writer thread dies
+        or `timeout` seconds pass first. A write that had already started when
+        the wait is abandoned may still commit.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return future.result(timeout=max(0, min(POLL_SECONDS, deadline - time.monotonic())))
+            except FutureTimeout:
+                pass
+            if future.done():
+                continue
+            if self._thread is None or not self._thread.is_alive():
+                future.cancel()
+                raise WriterUnavailable('The database writer stopped before completing this write.')
+            if time.monotonic() >= deadline:
+                future.cancel()
+                raise WriterUnavailable()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._apply(batch)
+        finally:
+            connection.close()
+
+    def _apply(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for fn, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, fn(), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # The shared commit failed, so nothing in this batch was written
+            outcomes = [(future, None, exc) for future, _, _ in outcomes]
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+_write_queue = WriteQueue(settings.SQLITE_WRITE_QUEUE_BATCH)
+
+
+def run_write(fn):
+    """Run `fn` in a write transaction, through the writer thread when enabled"""
+    if settings.SQLITE_WRITE_QUEUE and not connection.in_atomic_block:
+        return _write_queue.wait(_write_queue.submit(fn), settings.SQLITE_WRITE_QUEUE_TIMEOUT)
+    with transaction.atomic():
+        return fn()
@@ -1,8 +1,11 @@
 from django.contrib import admin
+from hms_config.admin_utils import LargeTableAdminMixin, staff_filter
 from .models import NurseTask
 
 @admin.register(NurseTask)
-class NurseTaskAdmin(admin.ModelAdmin):
+class NurseTaskAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['title', 'nurse', 'patient', 'scheduled_time', 'completed']
-    list_filter = ['nurse', 'completed']
+    list_filter = [staff_filter('nurse', 'nurse'), 'completed']
+    list_select_related = ['nurse', 'patient']
+    autocomplete_fields = ['nurse', 'patient']
     search_fields = ['title', 'patient__first_name', 'patient__last_name']
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class NurseTasksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'nurse_tasks'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,154 @@
+import threading
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from appointments.models import Appointment
+from patients.models import MedicalRecord, Patient, PatientAssignmentLog
+from .models import NurseTask
+
+VITALS = ('blood_pressure', 'temperature', 'heart_rate', 'respiratory_rate', 'oxygen_saturation')
+
+_pending = threading.local()
+
+HAS_VITALS = ~Q(blood_pressure='') | Q(temperature__isnull=False) | Q(heart_rate__isnull=False) | Q(
+    respiratory_rate__isnull=False) | Q(oxygen_saturation__isnull=False)
+
+
+def _key(nurse_id):
+    return f'nurse-handover:{nurse_id}'
+
+
+def next_shift_start(now=None):
+    """The first NURSE_SHIFT_STARTS time at or after `now`"""
+    now = timezone.localtime(now)
+    starts = sorted(time.fromisoformat(start.strip()) for start in settings.NURSE_SHIFT_STARTS)
+    for day in (now.date(), now.date() + timedelta(days=1)):
+        for start in starts:
+            moment = timezone.make_aware(datetime.combine(day, start))
+            if moment >= now:
+                return moment
+
+
+def _name(first, last):
+    return f'{first} {last}'.strip() or None
+
+
+def build(nurse_ids, now=None):
+    """
+    Handover reports of `nurse_ids`, as {nurse_id: report}.
+
+    Five queries however many nurses and patients are covered: the assigned
+    patients with the id of their latest record carrying vitals, then those
+    records, the open tasks, today's appointments and the recent assignment
+    changes, each fetched for all patients at once.
+    """
+    now = timezone.localtime(now)
+    today = now.date()
+    latest_vitals = (MedicalRecord.objects.filter(HAS_VITALS, patient=OuterRef('pk'))
+                     .order_by('-visit_date', '-id').values('pk')[:1])
+    patients = list(
+        Patient.objects.filter(assigned_nurse_id__in=nurse_ids)
+        .with_age(today).annotate(vitals_record=Subquery(latest_vitals))
+        .order_by('last_name', 'first_name')
+        .values('id', 'patient_id', 'first_name', 'last_name', 'age', 'blood_group',
+                'assigned_nurse_id', 'vitals_record')
+    )
+    ids = [patient['id'] for patient in patients]
+
+    vitals = {
+        row.pop('patient_id'): row
+        for row in MedicalRecord.objects.filter(
+            pk__in=[patient['vitals_record'] for patient in patients if patient['vitals_record']]
+        ).values('patient_id', 'visit_date', *VITALS)
+    }
+
+    tasks = defaultdict(list)
+    for task in (NurseTask.objects.filter(patient_id__in=ids, completed=False)
+                 .order_by('scheduled_time')
+                 .values('id', 'patient_id', 'nurse_id', 'title', 'scheduled_time', 'created_at')):
+        created_at = task.pop('created_at')
+        task['overdue'] = (timezone.localtime(created_at).date() < today
+                           or task['scheduled_time'] < now.time())
+        tasks[task.pop('patient_id')].append(task)
+
+    appointments = defaultdict(list)
+    for row in (Appointment.objects.filter(patient_id__in=ids, appointment_date=today)
+                .order_by('appointment_time')
+                .values('id', 'appointment_id', 'patient_id', 'appointment_time', 'appointment_type',
+                        'status', 'doctor__first_name', 'doctor__last_name')):
+        row['doctor_name'] = _name(row.pop('doctor__first_name'), row.pop('doctor__last_name'))
+        appointments[row.pop('patient_id')].append(row)
+
+    changes = defaultdict(list)
+    since = now - timedelta(hours=settings.HANDOVER_ASSIGNMENT_HOURS)
+    for row in (PatientAssignmentLog.objects.filter(patient_id__in=ids, timestamp__gte=since)
+                .order_by('-timestamp')
+                .values('patient_id', 'timestamp', 'assigned_nurse_id',
+                        'assigned_by__first_name', 'assigned_by__last_name')):
+        row['assigned_by_name'] = _name(row.pop('assigned_by__first_name'), row.pop('assigned_by__last_name'))
+        changes[row.pop('patient_id')].append(row)
+
+    reports = {nurse_id: {'generated_at': now, 'patients': []} for nurse_id in nurse_ids}
+    for patient in patients:
+        pk = patient['id']
+        reports[patient['assigned_nurse_id']]['patients'].append({
+            'id': pk,
+            'patient_id': patient['patient_id'],
+            'full_name': f"{patient['first_name']} {patient['last_name']}",
+            'age': patient['age'],
+            'blood_group': patient['blood_group'],
+            'latest_vitals': vitals.get(pk),
+            'open_tasks': tasks[pk],
+            'overdue_tasks': sum(task['overdue'] for task in tasks[pk]),
+            'appointments_today': appointments[pk],
+            'assignment_changes': changes[pk],
+        })
+    return reports
+
+
+def cached(nurse_id):
+    """The precomputed report of `nurse_id`, or None"""
+    return cache.get(_key(nurse_id))
+
+
+def store(reports):
+    cache.set_many({_key(nurse_id): report for nurse_id, report in reports.items()},
+                   settings.HANDOVER_CACHE_SECONDS)
+
+
+def forget(nurse_ids):
+    """Drop the precomputed reports of `nurse_ids`"""
+    cache.delete_many([_key(nurse_id) for nurse_id in nurse_ids])
+
+
+def schedule_forget(patient_ids=(), nurse_ids=()):
+    """
+    Drop the reports covering `patient_ids`, and those of `nurse_ids`, once
+    the current transaction commits.
+
+    Like patients.activity.schedule_refresh, everything touched in one
+    transaction is handled by the first callback to run: one query finds
+    the patients' nurses and one cache call drops their reports.
+    """
+    if not hasattr(_pending, 'patients'):
+        _pending.patients, _pending.nurses = set(), set()
+    _pending.patients.update(patient_ids)
+    _pending.nurses.update(nurse_id for nurse_id in nurse_ids if nurse_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    patient_ids, nurse_ids = getattr(_pending, 'patients', None), getattr(_pending, 'nurses', None)
+    if not patient_ids and not nurse_ids:
+        return
+    _pending.patients, _pending.nurses = set(), set()
+    if patient_ids:
+        nurse_ids |= set(Patient.all_objects.filter(id__in=patient_ids, assigned_nurse__isnull=False)
+                         .values_list('assigned_nurse_id', flat=True))
+    forget(nurse_ids)
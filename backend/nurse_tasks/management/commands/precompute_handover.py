@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import User
+from nurse_tasks import handover
+
+
+class Command(BaseCommand):
+    help = "Build and cache the handover report of every nurse shortly before a shift starts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-minutes', type=int, default=15,
+                            help='Only run when a shift starts within this many minutes')
+        parser.add_argument('--force', action='store_true',
+                            help='Run regardless of the shift schedule')
+        parser.add_argument('--chunk-size', type=int, default=50,
+                            help='Nurses whose reports are built together')
+
+    def handle(self, *args, **options):
+        now = timezone.localtime()
+        shift_start = handover.next_shift_start(now)
+        if not options['force'] and shift_start - now > timedelta(minutes=options['lead_minutes']):
+            self.stdout.write(f"Next shift starts at {shift_start:%H:%M}; nothing to do")
+            return
+        nurse_ids = list(User.objects.filter(role='nurse', is_active=True)
+                         .order_by('id').values_list('id', flat=True))
+        for start in range(0, len(nurse_ids), options['chunk_size']):
+            # A fixed number of queries per chunk, however many patients each nurse has
+            handover.store(handover.build(nurse_ids[start:start + options['chunk_size']], now))
+        self.stdout.write(f"Precomputed handover reports for {len(nurse_ids)} nurse(s)")
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nurse_tasks', '0001_initial'),
+        ('patients', '0009_timeline_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nursetask',
+            index=models.Index(fields=['patient', 'created_at'], name='nurse_task_patient_idx'),
+        ),
+    ]
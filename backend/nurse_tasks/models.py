@@ -12,6 +12,9 @@ class NurseTask(models.Model):
 
     class Meta:
         ordering = ['scheduled_time']
+        indexes = [
+            models.Index(fields=['patient', 'created_at'], name='nurse_task_patient_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} for {self.patient} by {self.nurse}'
\ No newline at end of file
@@ -0,0 +1,56 @@
+from django.db import transaction
+from django.utils import timezone
+
+from hms_config.object_cache import invalidate
+from patients.activity import schedule_refresh
+from patients.models import MedicalRecord, MedicalRecordText, Patient
+from . import handover
+from .models import NurseTask
+
+VITALS = handover.VITALS
+ROUND_DIAGNOSIS = 'Ward round observations'
+
+
+def submit(nurse, tasks, vitals):
+    """
+    Apply a validated ward round in one transaction.
+
+    `tasks` are the NurseTask rows to complete, `vitals` the validated vitals
+    entries. Open tasks are closed with a single UPDATE (every row gets the
+    same value, so a per-row CASE from bulk_update buys nothing) and the
+    vitals become MedicalRecord and MedicalRecordText rows through two
+    bulk_creates. Returns per-item results in submission order.
+    """
+    now = timezone.now()
+    open_ids = [task.pk for task in tasks if not task.completed]
+    records = [
+        MedicalRecord(patient_id=entry['patient'], visit_date=entry.get('visit_date') or now,
+                      **{field: entry[field] for field in VITALS if field in entry})
+        for entry in vitals
+    ]
+    with transaction.atomic():
+        NurseTask.objects.filter(id__in=open_ids).update(completed=True)
+        # The side rows are written here because bulk_create bypasses MedicalRecord.save()
+        MedicalRecord.objects.bulk_create(records)
+        MedicalRecordText.objects.bulk_create([
+            MedicalRecordText(record=record, diagnosis=ROUND_DIAGNOSIS, symptoms='', notes=entry.get('notes', ''))
+            for record, entry in zip(records, vitals)
+        ])
+        # Bulk writes send no signals
+        patient_ids = {task.patient_id for task in tasks} | {entry['patient'] for entry in vitals}
+        for patient_id in patient_ids:
+            schedule_refresh(patient_id)
+        # Patients assigned to other nurses can be in the round too
+        handover.schedule_forget(patient_ids=patient_ids, nurse_ids=[nurse.pk])
+    invalidate(Patient, patient_ids)
+    invalidate(MedicalRecord, [record.pk for record in records])
+    return {
+        'tasks': [
+            {'id': task.pk, 'status': 'already_completed' if task.completed else 'completed'}
+            for task in tasks
+        ],
+        'vitals': [
+            {'patient': entry['patient'], 'medical_record': record.pk}
+            for record, entry in zip(records, vitals)
+        ],
+    }
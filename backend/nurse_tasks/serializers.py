@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from patients.models import MedicalRecord, Patient
 from .models import NurseTask
+from .rounds import VITALS, submit
 
 class NurseTaskSerializer(serializers.ModelSerializer):
     nurse_name = serializers.CharField(source='nurse.get_full_name', read_only=True)
@@ -9,3 +11,53 @@ class NurseTaskSerializer(serializers.ModelSerializer):
         model = NurseTask
         fields = '__all__'
         read_only_fields = ['id', 'created_at', 'nurse_name', 'patient_name']
+
+
+class RoundVitalsSerializer(serializers.ModelSerializer):
+    patient = serializers.IntegerField()
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    class Meta:
+        model = MedicalRecord
+        fields = ['patient', 'visit_date', *VITALS, 'notes']
+        extra_kwargs = {'visit_date': {'required': False}}
+
+    def validate(self, attrs):
+        if all(attrs.get(field) in (None, '') for field in VITALS):
+            raise serializers.ValidationError("Record at least one vital sign.")
+        return attrs
+
+
+class NurseRoundSerializer(serializers.Serializer):
+    """A whole ward round; each referenced model is checked with one query"""
+    completed_tasks = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    vitals = RoundVitalsSerializer(many=True, required=False, default=list)
+
+    def validate_completed_tasks(self, value):
+        tasks = {task.pk: task for task in NurseTask.objects.filter(id__in=value).only('nurse', 'patient', 'completed')}
+        missing = set(value) - set(tasks)
+        if missing:
+            raise serializers.ValidationError(f"Unknown tasks: {sorted(missing)}")
+        others = {pk for pk, task in tasks.items() if task.nurse_id != self.context['request'].user.pk}
+        if others:
+            raise serializers.ValidationError(f"Assigned to another nurse: {sorted(others)}")
+        return [tasks[pk] for pk in dict.fromkeys(value)]
+
+    def validate_vitals(self, value):
+        patient_ids = {entry['patient'] for entry in value}
+        missing = patient_ids - set(Patient.objects.filter(id__in=patient_ids).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(f"Unknown patients: {sorted(missing)}")
+        return value
+
+    def validate(self, attrs):
+        if not attrs['completed_tasks'] and not attrs['vitals']:
+            raise serializers.ValidationError("Submit at least one completed task or vitals entry.")
+        return attrs
+
+    def create(self, validated_data):
+        return submit(self.context['request'].user, validated_data['completed_tasks'], validated_data['vitals'])
+
+    def to_representation(self, instance):
+        # save() returns the per-item results of the round
+        return instance
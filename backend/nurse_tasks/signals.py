@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from hms_config import archival
+from hms_config.tracking import previous, track
+from patients.models import MedicalRecord, Patient
+from . import handover
+from .models import NurseTask
+
+# Precomputed handover reports go stale with any write to what they show
+track(NurseTask, 'patient_id')
+track(MedicalRecord, 'patient_id')
+track('appointments.Appointment', 'patient_id')
+track(Patient, 'assigned_nurse_id')
+
+
+@receiver(post_save, sender=NurseTask)
+@receiver(post_delete, sender=NurseTask)
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_save, sender='appointments.Appointment')
+@receiver(post_delete, sender='appointments.Appointment')
+def forget_patient_handover(sender, instance, raw=False, **kwargs):
+    if raw or archival.moving():
+        return
+    before = previous(instance) or {}
+    handover.schedule_forget(patient_ids={instance.patient_id, before.get('patient_id')} - {None})
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def forget_nurse_handover(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = previous(instance) or {}
+    # A reassigned patient leaves the previous nurse's report
+    handover.schedule_forget(nurse_ids=[instance.assigned_nurse_id, before.get('assigned_nurse_id')])
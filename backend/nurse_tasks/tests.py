@@ -0,0 +1,122 @@
+from datetime import time, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from hms_config.testing import clear_caches, client_for, make_patient, make_user
+from patients.models import MedicalRecord
+from . import handover
+from .rounds import ROUND_DIAGNOSIS
+from .models import NurseTask
+
+
+class HandoverTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.nurse = make_user('nurse')
+        self.client = client_for(self.nurse)
+        self.patient = make_patient(assigned_nurse=self.nurse)
+
+    def report(self):
+        response = self.client.get('/api/nurse/handover/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_report_covers_vitals_tasks_and_appointments(self):
+        now = timezone.now()
+        MedicalRecord.objects.create(patient=self.patient, visit_date=now - timedelta(hours=2), diagnosis='Obs',
+                                     symptoms='', heart_rate=72)
+        MedicalRecord.objects.create(patient=self.patient, visit_date=now - timedelta(hours=1), diagnosis='Note',
+                                     symptoms='')
+        NurseTask.objects.create(nurse=self.nurse, patient=self.patient, title='Obs', scheduled_time=time(0, 0))
+        Appointment.objects.create(patient=self.patient, doctor=make_user('doctor'), reason='Check-up',
+                                   appointment_date=timezone.localdate(), appointment_time=time(23, 59))
+        make_patient(assigned_nurse=make_user('nurse'))
+        [entry] = self.report()['patients']
+        self.assertEqual(entry['id'], self.patient.pk)
+        self.assertEqual(entry['latest_vitals']['heart_rate'], 72)
+        self.assertEqual((len(entry['open_tasks']), entry['overdue_tasks']), (1, 1))
+        self.assertEqual(len(entry['appointments_today']), 1)
+
+    def test_writes_drop_the_cached_report(self):
+        self.report()
+        self.assertIsNotNone(handover.cached(self.nurse.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/nurse-tasks/tasks/', {
+                'nurse': self.nurse.pk, 'patient': self.patient.pk, 'title': 'Meds', 'scheduled_time': '23:59',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(handover.cached(self.nurse.pk))
+        self.assertEqual(len(self.report()['patients'][0]['open_tasks']), 1)
+
+    def test_reassignment_drops_both_nurses_reports(self):
+        other = make_user('nurse')
+        handover.store(handover.build([self.nurse.pk, other.pk]))
+        with self.captureOnCommitCallbacks(execute=True):
+            client_for(make_user('admin')).post('/api/patients/bulk-assign/', {
+                'patients': [self.patient.pk], 'nurses': [other.pk],
+            }, format='json')
+        self.assertIsNone(handover.cached(self.nurse.pk))
+        self.assertIsNone(handover.cached(other.pk))
+
+    def test_precompute_stores_every_nurse(self):
+        call_command('precompute_handover', '--force', stdout=StringIO())
+        self.assertEqual([p['id'] for p in handover.cached(self.nurse.pk)['patients']], [self.patient.pk])
+
+    def test_only_nurses_get_a_report(self):
+        self.assertEqual(client_for(make_user('doctor')).get('/api/nurse/handover/').status_code, 403)
+
+
+class RoundTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.nurse = make_user('nurse')
+        self.client = client_for(self.nurse)
+        self.patient = make_patient(assigned_nurse=self.nurse)
+
+    def task(self, nurse=None, **fields):
+        return NurseTask.objects.create(nurse=nurse or self.nurse, patient=self.patient, title='Obs',
+                                        scheduled_time=time(8, 0), **fields)
+
+    def submit(self, body, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return (client or self.client).post('/api/nurse/rounds/', body, format='json')
+
+    def test_round_completes_tasks_and_records_vitals(self):
+        done, open_task = self.task(completed=True), self.task()
+        response = self.submit({
+            'completed_tasks': [done.pk, open_task.pk],
+            'vitals': [{'patient': self.patient.pk, 'heart_rate': 72, 'notes': 'Comfortable'}],
+        })
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([task['status'] for task in response.data['tasks']], ['already_completed', 'completed'])
+        self.assertFalse(NurseTask.objects.filter(completed=False).exists())
+        record = MedicalRecord.objects.get(pk=response.data['vitals'][0]['medical_record'])
+        self.assertEqual((record.heart_rate, record.diagnosis, record.notes), (72, ROUND_DIAGNOSIS, 'Comfortable'))
+
+    def test_tasks_of_other_nurses_are_rejected(self):
+        task = self.task(nurse=make_user('nurse'))
+        self.assertEqual(self.submit({'completed_tasks': [task.pk]}).status_code, 400)
+        self.assertFalse(NurseTask.objects.get(pk=task.pk).completed)
+
+    def test_only_nurses_submit_rounds(self):
+        response = self.submit({'completed_tasks': [self.task().pk]}, client=client_for(make_user('doctor')))
+        self.assertEqual(response.status_code, 403)
+
+    def test_assigned_nurses_lose_their_cached_report(self):
+        other = make_user('nurse')
+        with self.captureOnCommitCallbacks(execute=True):
+            patient = make_patient(assigned_nurse=other)
+        handover.store(handover.build([other.pk]))
+        self.submit({'vitals': [{'patient': patient.pk, 'heart_rate': 80}]})
+        self.assertIsNone(handover.cached(other.pk))
+
+    def test_cached_patient_details_are_replaced(self):
+        url = f'/api/patients/{self.patient.pk}/'
+        admin = client_for(make_user('admin'))
+        etag = admin.get(url)['ETag']
+        self.submit({'vitals': [{'patient': self.patient.pk, 'heart_rate': 72}]})
+        self.assertNotEqual(admin.get(url)['ETag'], etag)
@@ -1,10 +1,14 @@
-from rest_framework import viewsets, permissions, status
+from rest_framework import generics, viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from hms_config.db_routers import ReplicaReadMixin
+from hms_config.idempotency import IdempotentCreateMixin
+from . import handover
 from .models import NurseTask
-from .serializers import NurseTaskSerializer
+from .serializers import NurseRoundSerializer, NurseTaskSerializer
 
-class NurseTaskViewSet(viewsets.ModelViewSet):
+class NurseTaskViewSet(IdempotentCreateMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = NurseTask.objects.all()
     serializer_class = NurseTaskSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -17,3 +21,33 @@ class NurseTaskViewSet(viewsets.ModelViewSet):
         tasks = self.get_queryset().filter(nurse=request.user)
         serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
+
+
+
+class NurseHandoverView(ReplicaReadMixin, APIView):
+    """Vitals, tasks, today's appointments and assignment changes of every patient assigned to the nurse"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        nurse = request.user
+        if nurse.role != 'nurse':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        # Usually precomputed by precompute_handover just before the shift change
+        report = None if request.query_params.get('refresh') in ('1', 'true') else handover.cached(nurse.pk)
+        if report is None:
+            reports = handover.build([nurse.pk])
+            handover.store(reports)
+            report = reports[nurse.pk]
+        return Response(report)
+
+
+
+class NurseRoundView(IdempotentCreateMixin, generics.CreateAPIView):
+    """Complete tasks and record vitals for a whole ward round in one request and one transaction"""
+    serializer_class = NurseRoundSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'nurse':
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+        return super().post(request, *args, **kwargs)
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import ArchivedMedicalRecord, MedicalRecord, Patient, PatientActivity
+
+_pending = threading.local()
+
+
+def _counts(queryset, patient_ids, aggregate):
+    return dict(queryset.filter(patient__in=patient_ids).values_list('patient')
+                .annotate(value=aggregate).order_by())
+
+
+def _last_visits(patient_ids):
+    live = _counts(MedicalRecord.objects, patient_ids, Max('visit_date'))
+    archived = _counts(ArchivedMedicalRecord.objects, patient_ids, Max('visit_date'))
+    return {patient_id: max(filter(None, (live.get(patient_id), archived.get(patient_id))), default=None)
+            for patient_id in patient_ids}
+
+
+def _next_appointments(patient_ids):
+    from appointments.models import Appointment
+
+    upcoming = Appointment.objects.upcoming().filter(patient=OuterRef('pk')).order_by(
+        'appointment_date', 'appointment_time')
+    next_slots = Patient.all_objects.filter(id__in=patient_ids).annotate(
+        next_date=Subquery(upcoming.values('appointment_date')[:1]),
+        next_time=Subquery(upcoming.values('appointment_time')[:1]),
+    ).values_list('id', 'next_date', 'next_time')
+    return {patient_id: timezone.make_aware(datetime.combine(next_date, next_time)) if next_date else None
+            for patient_id, next_date, next_time in next_slots}
+
+
+def refresh(patient_ids):
+    """Recompute PatientActivity for `patient_ids` with a fixed number of set-based queries"""
+    from appointments.models import Appointment, ArchivedAppointment
+    from nurse_tasks.models import NurseTask
+
+    patient_ids = list(patient_ids)
+    if not patient_ids:
+        return
+    live = _counts(Appointment.objects, patient_ids, Count('id'))
+    archived = _counts(ArchivedAppointment.objects, patient_ids, Count('id'))
+    last_visits = _last_visits(patient_ids)
+    open_tasks = _counts(NurseTask.objects.filter(completed=False), patient_ids, Count('id'))
+
+    rows = [
+        PatientActivity(
+            patient_id=patient_id,
+            total_appointments=live.get(patient_id, 0) + archived.get(patient_id, 0),
+            next_appointment_at=next_at,
+            last_visit_date=last_visits[patient_id],
+            open_nurse_tasks=open_tasks.get(patient_id, 0),
+        )
+        for patient_id, next_at in _next_appointments(patient_ids).items()
+    ]
+    PatientActivity.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['patient'],
+        update_fields=['total_appointments', 'next_appointment_at', 'last_visit_date',
+                       'open_nurse_tasks', 'updated_at'],
+    )
+
+
+def _update(patient_id, **values):
+    """Apply `values` to one activity row; a patient without one gets a full refresh instead"""
+    if not PatientActivity.objects.filter(patient_id=patient_id).update(updated_at=timezone.now(), **values):
+        schedule_refresh(patient_id)
+
+
+def count(patient_id, **deltas):
+    """Add `deltas` to the patient's counters in one F() UPDATE"""
+    deltas = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if deltas:
+        _update(patient_id, **deltas)
+
+
+def saw_appointment(patient_id, starts_at):
+    """An upcoming appointment at `starts_at` was booked; it is the next one if it comes first"""
+    _update(patient_id, next_appointment_at=Coalesce(Least('next_appointment_at', Value(starts_at)), Value(starts_at)))
+
+
+def saw_visit(patient_id, visit_date):
+    """A visit on `visit_date` was recorded; it is the last one if nothing later is"""
+    _update(patient_id, last_visit_date=Coalesce(Greatest('last_visit_date', Value(visit_date)), Value(visit_date)))
+
+
+def refresh_next_appointment(patient_ids):
+    """Recompute only next_appointment_at, after an appointment moved, closed or went away"""
+    for patient_id, next_at in _next_appointments(set(patient_ids)).items():
+        _update(patient_id, next_appointment_at=next_at)
+
+
+def refresh_last_visit(patient_ids):
+    """Recompute only last_visit_date, after a record moved or went away"""
+    for patient_id, last_visit in _last_visits(set(patient_ids)).items():
+        _update(patient_id, last_visit_date=last_visit)
+
+
+def schedule_refresh(patient_id):
+    """
+    Refresh the patient's activity once the current transaction commits.
+
+    Every patient touched in one transaction is refreshed by the first
+    callback that runs; the rest find nothing pending. Ids left over from a
+    rolled back transaction are simply refreshed with the next commit.
+    """
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    _pending.ids.add(patient_id)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    patient_ids = getattr(_pending, 'ids', None)
+    if patient_ids:
+        _pending.ids = set()
+        refresh(patient_ids)
@@ -1,12 +1,30 @@
 from django.contrib import admin
-from .models import Patient, MedicalRecord
+from django.db.models import BinaryField, TextField
+from django.db.models.functions import Cast, Substr
+from hms_config.admin_utils import LargeTableAdminMixin, date_drilldown, staff_filter
+from .models import Patient, MedicalRecord, MedicalRecordText, PatientClinicalText, PossibleDuplicate
+
+
+class PatientClinicalTextInline(admin.StackedInline):
+    model = PatientClinicalText
+    verbose_name = 'Medical Information'
+    can_delete = False
+
+
+class MedicalRecordTextInline(admin.StackedInline):
+    model = MedicalRecordText
+    verbose_name = 'Clinical notes'
+    can_delete = False
 
 @admin.register(Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['patient_id', 'full_name', 'email', 'phone', 'blood_group', 'registered_date', 'is_active', 'assigned_nurse']
     list_filter = ['blood_group', 'gender', 'is_active', 'registered_date']
+    list_select_related = ['assigned_nurse']
+    autocomplete_fields = ['assigned_nurse', 'user']
     search_fields = ['patient_id', 'first_name', 'last_name', 'email', 'phone']
     readonly_fields = ['patient_id', 'registered_date', 'updated_at']
+    inlines = [PatientClinicalTextInline]
     
     
     fieldsets = (
@@ -19,9 +37,6 @@ class PatientAdmin(admin.ModelAdmin):
         ('Emergency Contact', {
             'fields': ('emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relation')
         }),
-        ('Medical Information', {
-            'fields': ('allergies', 'chronic_conditions', 'current_medications')
-        }),
         ('Assignments', {
             'fields': ('assigned_nurse',) 
         }),
@@ -31,8 +46,35 @@ class PatientAdmin(admin.ModelAdmin):
     )
 
 @admin.register(MedicalRecord)
-class MedicalRecordAdmin(admin.ModelAdmin):
+class MedicalRecordAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['patient', 'doctor', 'visit_date', 'diagnosis']
-    list_filter = ['visit_date', 'doctor']
-    search_fields = ['patient__first_name', 'patient__last_name', 'diagnosis']
-    date_hierarchy = 'visit_date'
+    list_filter = [date_drilldown('visit_date'), staff_filter('doctor', 'doctor')]
+    list_select_related = ['patient', 'doctor', 'clinical_text']
+    autocomplete_fields = ['patient', 'doctor']
+    search_fields = ['patient__first_name', 'patient__last_name']
+    inlines = [MedicalRecordTextInline]
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Also match the search term against diagnoses.
+
+        Diagnoses up to CLINICAL_TEXT_COMPRESS_BYTES are stored as a marker
+        byte followed by plain UTF-8, which LIKE can match once the marker is
+        cut off. Longer, compressed diagnoses are not searched.
+        """
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            plain = MedicalRecordText.objects.annotate(
+                marker=Substr('diagnosis', 1, 1, output_field=BinaryField()),
+                diagnosis_text=Cast(Substr('diagnosis', 2, output_field=BinaryField()), TextField()),
+            ).filter(marker=b'\x00', diagnosis_text__icontains=search_term)
+            results |= queryset.filter(pk__in=plain.values('record_id'))
+        return results, may_have_duplicates
+
+
+@admin.register(PossibleDuplicate)
+class PossibleDuplicateAdmin(admin.ModelAdmin):
+    list_display = ['patient', 'duplicate_of', 'score', 'detected_at']
+    list_select_related = ['patient', 'duplicate_of']
+    raw_id_fields = ['patient', 'duplicate_of']
+    ordering = ['-score']
@@ -0,0 +1,81 @@
+import heapq
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from hms_config.object_cache import invalidate
+
+from .models import Patient, PatientAssignmentLog
+
+
+def balance(patient_ids, loads):
+    """
+    Greedily hand each patient to the least loaded nurse.
+
+    `loads` maps nurse id to current workload. Returns a {patient_id: nurse_id}
+    dict and the final loads, in O(P log N) for P patients and N nurses.
+    """
+    heap = [(load, nurse_id) for nurse_id, load in loads.items()]
+    heapq.heapify(heap)
+    assignments = {}
+    for patient_id in patient_ids:
+        load, nurse_id = heapq.heappop(heap)
+        assignments[patient_id] = nurse_id
+        heapq.heappush(heap, (load + 1, nurse_id))
+    return assignments, {nurse_id: load for load, nurse_id in heap}
+
+
+def current_loads(nurse_ids, current_nurses):
+    """
+    Workload per nurse: assigned patients plus open tasks created today.
+
+    Patients in `current_nurses` ({patient_id: nurse_id}) are about to be
+    redistributed, so they are not counted against their current nurse.
+    """
+    from nurse_tasks.models import NurseTask
+
+    loads = dict.fromkeys(nurse_ids, 0)
+    assigned = (Patient.objects.filter(assigned_nurse__in=nurse_ids)
+                .values_list('assigned_nurse').annotate(n=Count('id')).order_by())
+    open_tasks = (NurseTask.objects.filter(nurse__in=nurse_ids, completed=False,
+                                           created_at__date=timezone.localdate())
+                  .values_list('nurse').annotate(n=Count('id')).order_by())
+    for nurse_id, count in [*assigned, *open_tasks]:
+        loads[nurse_id] += count
+    for nurse_id in current_nurses.values():
+        if nurse_id in loads:
+            loads[nurse_id] -= 1
+    return loads
+
+
+def bulk_assign(current_nurses, nurse_ids, assigned_by):
+    """
+    Spread the patients in `current_nurses` over `nurse_ids` by workload.
+
+    Changed assignments are written with one UPDATE per target nurse (much
+    cheaper than a per-row CASE from bulk_update) and audited with one
+    bulk_create of PatientAssignmentLog rows, all in one transaction.
+    """
+    from nurse_tasks import handover
+
+    assignments, loads = balance(sorted(current_nurses), current_loads(nurse_ids, current_nurses))
+    changed = defaultdict(list)
+    for patient_id, nurse_id in assignments.items():
+        if current_nurses[patient_id] != nurse_id:
+            changed[nurse_id].append(patient_id)
+    now = timezone.now()
+    with transaction.atomic():
+        for nurse_id, patient_ids in changed.items():
+            Patient.objects.filter(id__in=patient_ids).update(assigned_nurse=nurse_id, updated_at=now)
+            invalidate(Patient, patient_ids)
+        PatientAssignmentLog.objects.bulk_create([
+            PatientAssignmentLog(patient_id=patient_id, assigned_nurse_id=nurse_id, assigned_by=assigned_by)
+            for nurse_id, patient_ids in changed.items()
+            for patient_id in patient_ids
+        ])
+        # update() sends no signals, and both the old and the new nurses' handover reports change
+        moved = [patient_id for patient_ids in changed.values() for patient_id in patient_ids]
+        handover.schedule_forget(nurse_ids={*changed, *(current_nurses[patient_id] for patient_id in moved)})
+    return assignments, loads, sum(map(len, changed.values()))
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Patient, PossibleDuplicate
+from .phonetic import normalize_phone, soundex
+
+FIELDS = ('id', 'patient_id', 'first_name', 'last_name', 'date_of_birth', 'phone', 'is_active',
+          'surname_key', 'given_key', 'phone_key')
+# Oversized blocks (very common names) are compared within a sliding window instead of pairwise
+WINDOW = 20
+
+
+def _similarity(a, b):
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def score(a, b, floor=0):
+    """
+    0-1 likelihood that two patient rows are the same person.
+
+    Pairs that cannot reach `floor` even with identical names skip the
+    comparatively slow name comparison and return their partial score.
+    """
+    total = 0
+    dob_a, dob_b = a['date_of_birth'], b['date_of_birth']
+    if dob_a == dob_b:
+        total += 0.3
+    elif dob_a.year == dob_b.year and (dob_a.month, dob_a.day) == (dob_b.day, dob_b.month):
+        # Day and month transposed on entry
+        total += 0.15
+    if a['phone_key'] and a['phone_key'] == b['phone_key']:
+        total += 0.2
+    if total + 0.5 < floor:
+        return round(total, 3)
+    names = (_similarity(a['first_name'], b['first_name']) + _similarity(a['last_name'], b['last_name'])) / 2
+    swapped = (_similarity(a['first_name'], b['last_name']) + _similarity(a['last_name'], b['first_name'])) / 2
+    return round(total + 0.5 * max(names, swapped), 3)
+
+
+def _with_keys(data):
+    return {
+        **data,
+        'surname_key': soundex(data['last_name']),
+        'given_key': soundex(data['first_name']),
+        'phone_key': normalize_phone(data.get('phone')),
+    }
+
+
+def find_candidates(data, exclude_id=None, threshold=None):
+    """
+    Existing patients likely to be the person described by `data`, best first.
+
+    Only rows sharing a blocking key are scored: the phonetic full name, the
+    date of birth with the phonetic surname, or the normalized phone.
+    """
+    threshold = settings.DUPLICATE_PATIENT_THRESHOLD if threshold is None else threshold
+    row = _with_keys(data)
+    blocks = (Q(surname_key=row['surname_key'], given_key=row['given_key'])
+              | Q(date_of_birth=row['date_of_birth'], surname_key=row['surname_key']))
+    if row['phone_key']:
+        blocks |= Q(phone_key=row['phone_key'])
+    scored = [
+        (score(row, other, threshold), other)
+        for other in Patient.all_objects.filter(blocks).exclude(pk=exclude_id).values(*FIELDS)
+    ]
+    return sorted(((s, other) for s, other in scored if s >= threshold), key=lambda item: -item[0])
+
+
+def describe(candidates):
+    return [
+        {'id': other['id'], 'patient_id': other['patient_id'],
+         'full_name': f"{other['first_name']} {other['last_name']}",
+         'date_of_birth': other['date_of_birth'], 'is_active': other['is_active'], 'score': s}
+        for s, other in candidates
+    ]
+
+
+def record(patient, candidates):
+    PossibleDuplicate.objects.bulk_create([
+        PossibleDuplicate(patient=patient, duplicate_of_id=other['id'], score=s)
+        for s, other in candidates
+    ], ignore_conflicts=True)
+
+
+def _block_keys(row):
+    if row['surname_key']:
+        yield 'name', row['surname_key'], row['given_key']
+        yield 'dob', row['date_of_birth'], row['surname_key']
+    if row['phone_key']:
+        yield 'phone', row['phone_key']
+
+
+def find_clusters(threshold=None):
+    """
+    Scan every patient for duplicate groups.
+
+    Rows are bucketed by blocking key in one pass and scored only within a
+    bucket, so the work grows with the table size rather than its square.
+    Returns (clusters, pairs): lists of patient ids and {(id, id): score}.
+    """
+    threshold = settings.DUPLICATE_PATIENT_THRESHOLD if threshold is None else threshold
+    blocks = defaultdict(list)
+    for row in Patient.all_objects.values(*FIELDS).iterator(chunk_size=2000):
+        for key in _block_keys(row):
+            blocks[key].append(row)
+
+    pairs = {}
+    for rows in blocks.values():
+        if len(rows) > WINDOW:
+            rows.sort(key=lambda row: (row['date_of_birth'], row['phone_key']))
+        for i, row in enumerate(rows):
+            for other in rows[i + 1:i + 1 + WINDOW]:
+                pair = (min(row['id'], other['id']), max(row['id'], other['id']))
+                if pair not in pairs:
+                    pairs[pair] = score(row, other, threshold)
+    pairs = {pair: s for pair, s in pairs.items() if s >= threshold}
+
+    parent = {}
+
+    def root(pk):
+        while parent.get(pk, pk) != pk:
+            parent[pk] = parent.get(parent[pk], parent[pk])
+            pk = parent[pk]
+        return pk
+
+    for a, b in pairs:
+        parent[root(b)] = root(a)
+    clusters = defaultdict(list)
+    for pk in {pk for pair in pairs for pk in pair}:
+        clusters[root(pk)].append(pk)
+    return sorted((sorted(ids) for ids in clusters.values()), key=lambda ids: ids[0]), pairs
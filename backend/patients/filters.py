@@ -0,0 +1,19 @@
+from django_filters import rest_framework as filters
+
+from .models import Patient
+
+
+# Beyond this the date-of-birth cutoffs would leave the supported date range
+MAX_AGE = 150
+
+
+class PatientFilter(filters.FilterSet):
+    age_min = filters.NumberFilter(method='filter_age', label='Minimum age in years', min_value=0, max_value=MAX_AGE)
+    age_max = filters.NumberFilter(method='filter_age', label='Maximum age in years', min_value=0, max_value=MAX_AGE)
+
+    class Meta:
+        model = Patient
+        fields = ['blood_group', 'gender', 'is_active', 'assigned_nurse']
+
+    def filter_age(self, queryset, name, value):
+        return queryset.age_between(**{name: int(value)})
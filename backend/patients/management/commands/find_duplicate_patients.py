@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from patients.duplicates import find_clusters
+from patients.models import PossibleDuplicate
+
+
+class Command(BaseCommand):
+    help = "Scan all patients for likely duplicate records and optionally flag them for review"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='Minimum match score (defaults to DUPLICATE_PATIENT_THRESHOLD)')
+        parser.add_argument('--record', action='store_true',
+                            help='Save every matching pair as a PossibleDuplicate')
+
+    def handle(self, *args, **options):
+        clusters, pairs = find_clusters(options['threshold'])
+        for ids in clusters:
+            self.stdout.write(', '.join(str(pk) for pk in ids))
+        if options['record']:
+            # The newer record is flagged as the possible duplicate of the older one
+            PossibleDuplicate.objects.bulk_create([
+                PossibleDuplicate(patient_id=newer, duplicate_of_id=older, score=score)
+                for (older, newer), score in pairs.items()
+            ], batch_size=500, ignore_conflicts=True)
+        self.stdout.write(f"Found {len(clusters)} cluster(s) from {len(pairs)} matching pair(s)")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from patients.activity import refresh
+from patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = "Recompute PatientActivity for every patient to repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        patient_ids = Patient.all_objects.order_by('id').values_list('id', flat=True)
+        batch, total = [], 0
+        for patient_id in patient_ids.iterator(chunk_size=options['batch_size']):
+            batch.append(patient_id)
+            if len(batch) == options['batch_size']:
+                refresh(batch)
+                total += len(batch)
+                batch = []
+        refresh(batch)
+        total += len(batch)
+        self.stdout.write(f"Rebuilt activity for {total} patient(s)")
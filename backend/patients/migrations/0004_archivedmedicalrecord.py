@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0003_patientassignmentlog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMedicalRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('visit_date', models.DateTimeField()),
+                ('diagnosis', models.TextField()),
+                ('symptoms', models.TextField()),
+                ('prescription', models.TextField(blank=True)),
+                ('lab_results', models.TextField(blank=True)),
+                ('notes', models.TextField(blank=True)),
+                ('blood_pressure', models.CharField(blank=True, max_length=20)),
+                ('temperature', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True)),
+                ('heart_rate', models.IntegerField(blank=True, null=True)),
+                ('respiratory_rate', models.IntegerField(blank=True, null=True)),
+                ('oxygen_saturation', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_medical_records', to='patients.patient')),
+            ],
+            options={
+                'ordering': ['-visit_date'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0004_archivedmedicalrecord'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['visit_date'], name='medical_record_visit_idx'),
+        ),
+    ]
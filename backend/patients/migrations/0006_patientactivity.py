@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0005_medical_record_visit_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientActivity',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='activity', serialize=False, to='patients.patient')),
+                ('total_appointments', models.IntegerField(default=0)),
+                ('next_appointment_at', models.DateTimeField(blank=True, null=True)),
+                ('last_visit_date', models.DateTimeField(blank=True, null=True)),
+                ('open_nurse_tasks', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'patient activity',
+            },
+        ),
+    ]
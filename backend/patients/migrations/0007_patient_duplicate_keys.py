@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from patients.phonetic import normalize_phone, soundex
+
+
+def fill_keys(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    patients = list(Patient.objects.only('first_name', 'last_name', 'phone'))
+    for patient in patients:
+        patient.surname_key = soundex(patient.last_name)
+        patient.given_key = soundex(patient.first_name)
+        patient.phone_key = normalize_phone(patient.phone)
+    Patient.objects.bulk_update(patients, ['surname_key', 'given_key', 'phone_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_patientactivity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PossibleDuplicate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='given_key',
+            field=models.CharField(blank=True, editable=False, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='surname_key',
+            field=models.CharField(blank=True, editable=False, max_length=4),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['surname_key', 'given_key'], name='patient_name_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['date_of_birth', 'surname_key'], name='patient_dob_surname_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['phone_key'], name='patient_phone_key_idx'),
+        ),
+        migrations.AddField(
+            model_name='possibleduplicate',
+            name='duplicate_of',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.patient'),
+        ),
+        migrations.AddField(
+            model_name='possibleduplicate',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='possible_duplicates', to='patients.patient'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='possibleduplicate',
+            unique_together={('patient', 'duplicate_of')},
+        ),
+        migrations.RunPython(fill_keys, migrations.RunPython.noop),
+    ]
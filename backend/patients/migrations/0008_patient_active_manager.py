@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_patient_duplicate_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-registered_date'], name='patient_active_registered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['last_name', 'first_name'], name='patient_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['assigned_nurse'], name='patient_active_nurse_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_patient_active_manager'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['patient', 'visit_date'], name='medical_record_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientassignmentlog',
+            index=models.Index(fields=['patient', 'timestamp'], name='assignment_log_patient_idx'),
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:19
+
+import django.db.models.deletion
+import hms_config.fields
+from django.db import migrations, models
+
+PATIENT_TEXT = ('allergies', 'chronic_conditions', 'current_medications')
+RECORD_TEXT = ('diagnosis', 'symptoms', 'prescription', 'lab_results', 'notes')
+
+
+def copy_text(apps, schema_editor):
+    for owner, side, link, fields in (
+        ('Patient', 'PatientClinicalText', 'patient', PATIENT_TEXT),
+        ('MedicalRecord', 'MedicalRecordText', 'record', RECORD_TEXT),
+    ):
+        Owner = apps.get_model('patients', owner)
+        Side = apps.get_model('patients', side)
+        rows = Owner.objects.values('pk', *fields).iterator(chunk_size=500)
+        Side.objects.bulk_create(
+            (Side(**{f'{link}_id': row.pop('pk')}, **row) for row in rows),
+            batch_size=500,
+        )
+
+
+def restore_text(apps, schema_editor):
+    for owner, side, link, fields in (
+        ('Patient', 'PatientClinicalText', 'patient', PATIENT_TEXT),
+        ('MedicalRecord', 'MedicalRecordText', 'record', RECORD_TEXT),
+    ):
+        Owner = apps.get_model('patients', owner)
+        Side = apps.get_model('patients', side)
+        for row in Side.objects.values(f'{link}_id', *fields).iterator(chunk_size=500):
+            Owner.objects.filter(pk=row.pop(f'{link}_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedicalRecordText',
+            fields=[
+                ('record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='clinical_text', serialize=False, to='patients.medicalrecord')),
+                ('diagnosis', hms_config.fields.CompressedTextField()),
+                ('symptoms', hms_config.fields.CompressedTextField()),
+                ('prescription', hms_config.fields.CompressedTextField(blank=True)),
+                ('lab_results', hms_config.fields.CompressedTextField(blank=True)),
+                ('notes', hms_config.fields.CompressedTextField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PatientClinicalText',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='clinical_text', serialize=False, to='patients.patient')),
+                ('allergies', hms_config.fields.CompressedTextField(blank=True, help_text='List of allergies')),
+                ('chronic_conditions', hms_config.fields.CompressedTextField(blank=True, help_text='Chronic medical conditions')),
+                ('current_medications', hms_config.fields.CompressedTextField(blank=True, help_text='Current medications')),
+            ],
+        ),
+        migrations.RunPython(copy_text, restore_text),
+        # Lets the columns be re-added on existing rows when migrating backwards
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='diagnosis',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='medicalrecord',
+            name='symptoms',
+            field=models.TextField(default=''),
+        ),
+        migrations.RemoveField(
+            model_name='medicalrecord',
+            name='diagnosis',
+        ),
+        migrations.RemoveField(
+            model_name='medicalrecord',
+            name='lab_results',
+        ),
+        migrations.RemoveField(
+            model_name='medicalrecord',
+            name='notes',
+        ),
+        migrations.RemoveField(
+            model_name='medicalrecord',
+            name='prescription',
+        ),
+        migrations.RemoveField(
+            model_name='medicalrecord',
+            name='symptoms',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='allergies',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='chronic_conditions',
+        ),
+        migrations.RemoveField(
+            model_name='patient',
+            name='current_medications',
+        ),
+    ]
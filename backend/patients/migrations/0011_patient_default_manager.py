@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:46
+
+import django.db.models.manager
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0010_clinical_text_side_tables'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='patient',
+            options={'default_manager_name': 'all_objects', 'ordering': ['-registered_date']},
+        ),
+        migrations.AlterModelManagers(
+            name='patient',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -1,7 +1,137 @@
-from django.db import models
+from datetime import date
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
 from accounts.models import User
+from hms_config.fields import CompressedTextField
+from .phonetic import normalize_phone, soundex
 
-class Patient(models.Model):
+
+def cancel_future_appointments(patient_ids):
+    """Cancel every upcoming appointment of `patient_ids` in one UPDATE, returning the count"""
+    from appointments.models import Appointment
+    from hms_config.object_cache import invalidate
+    from .activity import refresh as refresh_activity
+
+    upcoming = Appointment.objects.filter(patient__in=patient_ids).upcoming()
+    appointment_ids = list(upcoming.values_list('id', flat=True))
+    cancelled = upcoming.filter(id__in=appointment_ids).update(status='cancelled', updated_at=timezone.now())
+    # update() skips signals, so refresh activity and cached responses here
+    refresh_activity(patient_ids)
+    invalidate(Appointment, appointment_ids)
+    return cancelled
+
+
+def years_before(day, years):
+    """The date `years` years before `day`; 29 February maps to the 28th in non-leap years"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def clinical_text(name):
+    """Attribute that reads and writes `name` on the owner's clinical_text side row"""
+    def get(self):
+        return getattr(self._clinical_text(), name)
+    
+    def set(self, value):
+        setattr(self._clinical_text(), name, value)
+        self._clinical_text_dirty = True
+    
+    return property(get, set)
+
+
+class ClinicalTextMixin:
+    """
+    Keep bulky free text on a one-to-one `clinical_text` side row.
+
+    The row is fetched on first access, or up front with
+    select_related('clinical_text'), so list queries and scans of the owner
+    table never read it. It is created with the owner and saved with it
+    whenever one of its attributes was assigned.
+    """
+    
+    def _clinical_text(self):
+        if '_clinical_text_row' not in self.__dict__:
+            try:
+                row = self.clinical_text
+            except ObjectDoesNotExist:
+                rel = self._meta.get_field('clinical_text')
+                row = rel.related_model(**{rel.field.name: self})
+            self._clinical_text_row = row
+        return self._clinical_text_row
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding or self.__dict__.get('_clinical_text_dirty'):
+            row = self._clinical_text()
+            setattr(row, self._meta.get_field('clinical_text').field.name, self)
+            row.save()
+            self._clinical_text_dirty = False
+    
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop('_clinical_text_row', None)
+        self.__dict__.pop('_clinical_text_dirty', None)
+        super().refresh_from_db(*args, **kwargs)
+
+
+class PatientQuerySet(models.QuerySet):
+    def with_age(self, today=None):
+        """Annotate the age in whole years, computed by the database"""
+        today = today or date.today()
+        birthday_ahead = Q(date_of_birth__month__gt=today.month) | Q(
+            date_of_birth__month=today.month, date_of_birth__day__gt=today.day)
+        return self.annotate(age=Value(today.year) - ExtractYear('date_of_birth') - Case(
+            When(birthday_ahead, then=Value(1)), default=Value(0), output_field=IntegerField(),
+        ))
+    
+    def age_between(self, age_min=None, age_max=None, today=None):
+        """Filter by age as date_of_birth ranges, which an index on date_of_birth can serve"""
+        today = today or date.today()
+        queryset = self
+        if age_min is not None:
+            queryset = queryset.filter(date_of_birth__lte=years_before(today, age_min))
+        if age_max is not None:
+            queryset = queryset.filter(date_of_birth__gt=years_before(today, age_max + 1))
+        return queryset
+    
+    def age_band(self, width, today=None, oldest=120):
+        """Expression numbering `width`-year age bands from 0, built from date_of_birth cutoffs"""
+        today = today or date.today()
+        return Case(
+            *(When(date_of_birth__gt=years_before(today, (band + 1) * width), then=Value(band))
+              for band in range(oldest // width + 1)),
+            default=Value(oldest // width + 1), output_field=IntegerField(),
+        )
+    
+    def deactivate(self):
+        """
+        Deactivate these patients and cancel their future appointments.
+
+        Both are single UPDATE statements however many patients are involved.
+        Returns the number of appointments cancelled.
+        """
+        from hms_config.object_cache import invalidate
+        from nurse_tasks.handover import schedule_forget
+
+        with transaction.atomic():
+            patient_ids = list(self.filter(is_active=True).values_list('id', flat=True))
+            Patient.all_objects.filter(id__in=patient_ids).update(is_active=False, updated_at=timezone.now())
+            invalidate(Patient, patient_ids)
+            schedule_forget(patient_ids=patient_ids)
+            return cancel_future_appointments(patient_ids)
+
+
+class ActivePatientManager(models.Manager.from_queryset(PatientQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
+class Patient(ClinicalTextMixin, models.Model):
     BLOOD_GROUP_CHOICES = (
         ('A+', 'A+'), ('A-', 'A-'),
         ('B+', 'B+'), ('B-', 'B-'),
@@ -38,10 +168,11 @@ class Patient(models.Model):
     emergency_contact_phone = models.CharField(max_length=15)
     emergency_contact_relation = models.CharField(max_length=50)
     
-    # Medical Information
-    allergies = models.TextField(blank=True, help_text="List of allergies")
-    chronic_conditions = models.TextField(blank=True, help_text="Chronic medical conditions")
-    current_medications = models.TextField(blank=True, help_text="Current medications")
+    # Medical Information, stored in PatientClinicalText
+    CLINICAL_TEXT_FIELDS = ('allergies', 'chronic_conditions', 'current_medications')
+    allergies = clinical_text('allergies')
+    chronic_conditions = clinical_text('chronic_conditions')
+    current_medications = clinical_text('current_medications')
     
     # System Fields
     patient_id = models.CharField(max_length=20, unique=True, editable=False)
@@ -49,6 +180,11 @@ class Patient(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    # Blocking keys for duplicate detection, kept in sync by save()
+    surname_key = models.CharField(max_length=4, blank=True, editable=False)
+    given_key = models.CharField(max_length=4, blank=True, editable=False)
+    phone_key = models.CharField(max_length=10, blank=True, editable=False)
+    
     assigned_nurse = models.ForeignKey(
         User, null=True, blank=True, 
         on_delete=models.SET_NULL,
@@ -56,16 +192,39 @@ class Patient(models.Model):
         limit_choices_to={'role': 'nurse'}
     )
     
+    # Active patients only; all_objects also returns deactivated records
+    objects = ActivePatientManager()
+    all_objects = PatientQuerySet.as_manager()
+    
     class Meta:
+        # Uniqueness checks, related fields and the admin must see deactivated rows too
+        default_manager_name = 'all_objects'
         ordering = ['-registered_date']
+        indexes = [
+            # Hot lookups only ever touch active patients
+            models.Index(fields=['-registered_date'], name='patient_active_registered_idx', condition=Q(is_active=True)),
+            models.Index(fields=['last_name', 'first_name'], name='patient_active_name_idx', condition=Q(is_active=True)),
+            models.Index(fields=['assigned_nurse'], name='patient_active_nurse_idx', condition=Q(is_active=True)),
+            models.Index(fields=['surname_key', 'given_key'], name='patient_name_key_idx'),
+            models.Index(fields=['date_of_birth', 'surname_key'], name='patient_dob_surname_idx'),
+            models.Index(fields=['phone_key'], name='patient_phone_key_idx'),
+        ]
         
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.patient_id})"
     
     def save(self, *args, **kwargs):
+        # A changed date of birth invalidates any annotated age
+        self.__dict__.pop('_age', None)
+        self.surname_key = soundex(self.last_name)
+        self.given_key = soundex(self.first_name)
+        self.phone_key = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'surname_key', 'given_key', 'phone_key'}
         if not self.patient_id:
             # Generate unique patient ID
-            last_patient = Patient.objects.order_by('-id').first()
+            last_patient = Patient.all_objects.order_by('-id').first()
             if last_patient:
                 last_id = int(last_patient.patient_id.split('-')[1])
                 self.patient_id = f"PAT-{str(last_id + 1).zfill(6)}"
@@ -79,21 +238,29 @@ class Patient(models.Model):
     
     @property
     def age(self):
-        from datetime import date
+        # Prefer the value annotated by PatientQuerySet.with_age()
+        if '_age' in self.__dict__:
+            return self._age
         today = date.today()
         return today.year - self.date_of_birth.year - ((today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day))
+    
+    @age.setter
+    def age(self, value):
+        self._age = value
 
 
-class MedicalRecord(models.Model):
+class MedicalRecord(ClinicalTextMixin, models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='medical_records')
     doctor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, limit_choices_to={'role': 'doctor'})
     
     visit_date = models.DateTimeField()
-    diagnosis = models.TextField()
-    symptoms = models.TextField()
-    prescription = models.TextField(blank=True)
-    lab_results = models.TextField(blank=True)
-    notes = models.TextField(blank=True)
+    # Stored in MedicalRecordText
+    CLINICAL_TEXT_FIELDS = ('diagnosis', 'symptoms', 'prescription', 'lab_results', 'notes')
+    diagnosis = clinical_text('diagnosis')
+    symptoms = clinical_text('symptoms')
+    prescription = clinical_text('prescription')
+    lab_results = clinical_text('lab_results')
+    notes = clinical_text('notes')
     
     # Vitals
     blood_pressure = models.CharField(max_length=20, blank=True)
@@ -107,16 +274,109 @@ class MedicalRecord(models.Model):
     
     class Meta:
         ordering = ['-visit_date']
+        indexes = [
+            models.Index(fields=['visit_date'], name='medical_record_visit_idx'),
+            models.Index(fields=['patient', 'visit_date'], name='medical_record_patient_idx'),
+        ]
     
     def __str__(self):
         return f"{self.patient.full_name} - {self.visit_date.date()}"
 
 
+class PatientClinicalText(models.Model):
+    """Free-text medical history of a Patient, kept out of the patients table"""
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name='clinical_text')
+    allergies = CompressedTextField(blank=True, help_text="List of allergies")
+    chronic_conditions = CompressedTextField(blank=True, help_text="Chronic medical conditions")
+    current_medications = CompressedTextField(blank=True, help_text="Current medications")
+    
+    def __str__(self):
+        return f"Clinical text for patient {self.patient_id}"
+
+
+class MedicalRecordText(models.Model):
+    """Free text of a MedicalRecord, kept out of the medical records table"""
+    record = models.OneToOneField(MedicalRecord, on_delete=models.CASCADE, primary_key=True, related_name='clinical_text')
+    diagnosis = CompressedTextField()
+    symptoms = CompressedTextField()
+    prescription = CompressedTextField(blank=True)
+    lab_results = CompressedTextField(blank=True)
+    notes = CompressedTextField(blank=True)
+    
+    def __str__(self):
+        return f"Clinical text for medical record {self.record_id}"
+
+
 class PatientAssignmentLog(models.Model):
     patient = models.ForeignKey('Patient', on_delete=models.CASCADE, related_name='assignment_logs')
     assigned_nurse = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
     assigned_by = models.ForeignKey(User, related_name='nurse_assignments_made', on_delete=models.SET_NULL, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'timestamp'], name='assignment_log_patient_idx'),
+        ]
+
+    def __str__(self):
+        return f'Assigned {self.assigned_nurse} to {self.patient} by {self.assigned_by} on {self.timestamp}'
+
+class ArchivedMedicalRecord(models.Model):
+    """Aged MedicalRecord rows moved out of the hot table by archive_history"""
+    id = models.BigIntegerField(primary_key=True)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='archived_medical_records')
+    doctor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    
+    visit_date = models.DateTimeField()
+    diagnosis = models.TextField()
+    symptoms = models.TextField()
+    prescription = models.TextField(blank=True)
+    lab_results = models.TextField(blank=True)
+    notes = models.TextField(blank=True)
+    
+    blood_pressure = models.CharField(max_length=20, blank=True)
+    temperature = models.DecimalField(max_digits=4, decimal_places=1, null=True, blank=True)
+    heart_rate = models.IntegerField(null=True, blank=True)
+    respiratory_rate = models.IntegerField(null=True, blank=True)
+    oxygen_saturation = models.IntegerField(null=True, blank=True)
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-visit_date']
+    
+    def __str__(self):
+        return f"{self.patient.full_name} - {self.visit_date.date()} (archived)"
+
+
+class PatientActivity(models.Model):
+    """Per-patient facts kept current by patients.activity; rebuild_patient_activity repairs drift"""
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True, related_name='activity')
+    total_appointments = models.IntegerField(default=0)
+    next_appointment_at = models.DateTimeField(null=True, blank=True)
+    last_visit_date = models.DateTimeField(null=True, blank=True)
+    open_nurse_tasks = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'patient activity'
+    
+    def __str__(self):
+        return f"Activity for patient {self.patient_id}"
+
+
+class PossibleDuplicate(models.Model):
+    """A pair of patient records that duplicate detection scored as likely the same person"""
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='possible_duplicates')
+    duplicate_of = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    detected_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-score']
+        unique_together = ['patient', 'duplicate_of']
+    
     def __str__(self):
-        return f'Assigned {self.assigned_nurse} to {self.patient} by {self.assigned_by} on {self.timestamp}'
\ No newline at end of file
+        return f"{self.patient_id} may duplicate {self.duplicate_of_id} ({self.score:.2f})"
@@ -0,0 +1,35 @@
+import re
+import unicodedata
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+
+
+def soundex(name):
+    """American Soundex code of `name`, e.g. 'Robert' and 'Rupert' both give 'R163'"""
+    letters = [c for c in unicodedata.normalize('NFKD', name or '').lower() if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code, vowels do
+        if letter not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def normalize_phone(phone):
+    """Digits only, keeping the last 10 so country prefixes and formatting don't matter"""
+    return re.sub(r'\D', '', phone or '')[-10:]
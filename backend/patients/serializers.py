@@ -1,30 +1,79 @@
 from rest_framework import serializers
 from .models import Patient, MedicalRecord
+from accounts.models import User
 from accounts.serializers import UserSerializer
 
-class PatientSerializer(serializers.ModelSerializer):
+class ClinicalTextFieldsMixin:
+    """Leave out the clinical text fields not named in context['text_fields'], if it is given"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = self.context.get('text_fields')
+        if wanted is not None:
+            for name in set(self.Meta.model.CLINICAL_TEXT_FIELDS) - set(wanted):
+                self.fields.pop(name, None)
+
+
+class PatientSerializer(ClinicalTextFieldsMixin, serializers.ModelSerializer):
     age = serializers.ReadOnlyField()
     full_name = serializers.ReadOnlyField()
+    # Stored in PatientClinicalText
+    allergies = serializers.CharField(required=False, allow_blank=True)
+    chronic_conditions = serializers.CharField(required=False, allow_blank=True)
+    current_medications = serializers.CharField(required=False, allow_blank=True)
     
     class Meta:
         model = Patient
-        fields = '__all__'
+        # Duplicate-detection blocking keys are internal
+        exclude = ['surname_key', 'given_key', 'phone_key']
         read_only_fields = ['patient_id', 'registered_date', 'updated_at', 'age', 'full_name', 'user']  # Added 'user'
 
 class PatientListSerializer(serializers.ModelSerializer):
     age = serializers.ReadOnlyField()
     full_name = serializers.ReadOnlyField()
+    # Annotated from PatientActivity by PatientViewSet.get_queryset()
+    total_appointments = serializers.ReadOnlyField()
+    next_appointment_at = serializers.ReadOnlyField()
+    last_visit_date = serializers.ReadOnlyField()
+    open_nurse_tasks = serializers.ReadOnlyField()
     
     class Meta:
         model = Patient
-        fields = ['id', 'patient_id', 'full_name', 'email', 'phone', 'age', 'blood_group', 'is_active']
+        fields = ['id', 'patient_id', 'full_name', 'email', 'phone', 'age', 'blood_group', 'is_active',
+                  'total_appointments', 'next_appointment_at', 'last_visit_date', 'open_nurse_tasks']
 
 
-class MedicalRecordSerializer(serializers.ModelSerializer):
+class MedicalRecordSerializer(ClinicalTextFieldsMixin, serializers.ModelSerializer):
     patient_name = serializers.CharField(source='patient.full_name', read_only=True)
     doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+    # Stored in MedicalRecordText
+    diagnosis = serializers.CharField()
+    symptoms = serializers.CharField()
+    prescription = serializers.CharField(required=False, allow_blank=True)
+    lab_results = serializers.CharField(required=False, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
     
     class Meta:
         model = MedicalRecord
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
+
+
+class BulkNurseAssignmentSerializer(serializers.Serializer):
+    patients = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    nurses = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    
+    def validate_patients(self, value):
+        # {patient_id: current nurse id}, fetched in one query
+        current = dict(Patient.objects.filter(id__in=value).values_list('id', 'assigned_nurse_id'))
+        missing = set(value) - set(current)
+        if missing:
+            raise serializers.ValidationError(f"Unknown patients: {sorted(missing)}")
+        return current
+    
+    def validate_nurses(self, value):
+        nurse_ids = set(User.objects.filter(id__in=value, role='nurse', is_active=True).values_list('id', flat=True))
+        missing = set(value) - nurse_ids
+        if missing:
+            raise serializers.ValidationError(f"Not active nurses: {sorted(missing)}")
+        return sorted(nurse_ids)
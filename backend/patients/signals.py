@@ -0,0 +1,99 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from hms_config import archival
+from hms_config.object_cache import invalidate, invalidate_instance
+from hms_config.tracking import previous, track
+from . import activity
+from .models import MedicalRecord, Patient, PatientActivity, PatientClinicalText
+
+post_save.connect(invalidate_instance, sender=Patient)
+post_delete.connect(invalidate_instance, sender=Patient)
+
+track('appointments.Appointment', 'patient_id', 'appointment_date', 'appointment_time', 'status')
+track(MedicalRecord, 'patient_id', 'visit_date')
+track('nurse_tasks.NurseTask', 'patient_id', 'completed')
+
+
+@receiver(post_save, sender=PatientClinicalText)
+def invalidate_patient_text(sender, instance, raw=False, **kwargs):
+    # The side row is written after the patient, so the cached payload may already be stale
+    if not raw:
+        invalidate(Patient, [instance.patient_id])
+
+
+@receiver(post_save, sender=Patient)
+def create_patient_activity(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PatientActivity.objects.get_or_create(patient=instance)
+
+
+# Each write adjusts only what it can change, with F() deltas where it can;
+# rebuild_patient_activity recomputes everything to repair drift.
+
+@receiver(post_save, sender='appointments.Appointment')
+def appointment_activity(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = previous(instance)
+    if created:
+        activity.count(instance.patient_id, total_appointments=1)
+        if instance.is_upcoming:
+            activity.saw_appointment(instance.patient_id, instance.starts_at)
+    elif before is None:
+        activity.schedule_refresh(instance.patient_id)
+    elif before['patient_id'] != instance.patient_id:
+        activity.count(before['patient_id'], total_appointments=-1)
+        activity.count(instance.patient_id, total_appointments=1)
+        activity.refresh_next_appointment([before['patient_id'], instance.patient_id])
+    elif any(before[field] != getattr(instance, field) for field in ('appointment_date', 'appointment_time', 'status')):
+        activity.refresh_next_appointment([instance.patient_id])
+
+
+@receiver(post_delete, sender='appointments.Appointment')
+def appointment_deleted_activity(sender, instance, **kwargs):
+    # Archived appointments still count and are never upcoming
+    if archival.moving():
+        return
+    activity.count(instance.patient_id, total_appointments=-1)
+    if instance.is_upcoming:
+        activity.refresh_next_appointment([instance.patient_id])
+
+
+@receiver(post_save, sender=MedicalRecord)
+def record_activity(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = previous(instance)
+    if created:
+        activity.saw_visit(instance.patient_id, instance.visit_date)
+    elif before is None:
+        activity.schedule_refresh(instance.patient_id)
+    elif before['patient_id'] != instance.patient_id or before['visit_date'] != instance.visit_date:
+        activity.refresh_last_visit([before['patient_id'], instance.patient_id])
+
+
+@receiver(post_delete, sender=MedicalRecord)
+def record_deleted_activity(sender, instance, **kwargs):
+    if archival.moving():
+        return
+    activity.refresh_last_visit([instance.patient_id])
+
+
+@receiver(post_save, sender='nurse_tasks.NurseTask')
+def task_activity(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = previous(instance)
+    if created:
+        activity.count(instance.patient_id, open_nurse_tasks=int(not instance.completed))
+    elif before is None:
+        activity.schedule_refresh(instance.patient_id)
+    elif (before['patient_id'], before['completed']) != (instance.patient_id, instance.completed):
+        activity.count(before['patient_id'], open_nurse_tasks=-int(not before['completed']))
+        activity.count(instance.patient_id, open_nurse_tasks=int(not instance.completed))
+
+
+@receiver(post_delete, sender='nurse_tasks.NurseTask')
+def task_deleted_activity(sender, instance, **kwargs):
+    activity.count(instance.patient_id, open_nurse_tasks=-int(not instance.completed))
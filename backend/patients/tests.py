@@ -1,3 +1,352 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import date, time, timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from hms_config.testing import clear_caches, client_for, make_patient, make_user
+from nurse_tasks.models import NurseTask
+from .assignment import balance
+from .duplicates import find_clusters
+from .models import MedicalRecord, MedicalRecordText, Patient, PatientActivity, PatientAssignmentLog, PossibleDuplicate, years_before
+
+
+class BalanceTests(SimpleTestCase):
+    def test_hands_patients_to_the_least_loaded_nurse(self):
+        assignments, loads = balance([1, 2, 3, 4], {10: 2, 20: 0})
+        self.assertEqual(assignments, {1: 20, 2: 20, 3: 10, 4: 20})
+        self.assertEqual(loads, {10: 3, 20: 3})
+
+
+class BulkAssignTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.nurses = [make_user('nurse') for _ in range(3)]
+        self.client = client_for(make_user('admin'))
+        self.patients = [make_patient() for _ in range(6)]
+
+    def assign(self, patients, nurses):
+        return self.client.post('/api/patients/bulk-assign/', {
+            'patients': [patient.pk for patient in patients], 'nurses': [nurse.pk for nurse in nurses],
+        }, format='json')
+
+    def test_spreads_patients_evenly_and_logs_changes(self):
+        response = self.assign(self.patients, self.nurses)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changed'], 6)
+        self.assertEqual(sorted(response.data['loads'].values()), [2, 2, 2])
+        self.assertEqual(PatientAssignmentLog.objects.count(), 6)
+
+    def test_open_tasks_count_towards_workload(self):
+        busy = self.nurses[0]
+        other = make_patient(assigned_nurse=busy)
+        for _ in range(4):
+            NurseTask.objects.create(nurse=busy, patient=other, title='Obs', scheduled_time='10:00')
+        self.assign(self.patients, self.nurses)
+        self.assertFalse(Patient.objects.filter(pk__in=[p.pk for p in self.patients], assigned_nurse=busy).exists())
+
+    def test_unchanged_assignments_are_not_logged(self):
+        self.assign(self.patients[:1], self.nurses[:1])
+        response = self.assign(self.patients[:1], self.nurses[:1])
+        self.assertEqual(response.data['changed'], 0)
+        self.assertEqual(PatientAssignmentLog.objects.count(), 1)
+
+    def test_rejects_unknown_patients_and_non_nurses(self):
+        response = self.client.post('/api/patients/bulk-assign/', {
+            'patients': [10 ** 9], 'nurses': [make_user('doctor').pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('patients', response.data)
+        self.assertIn('nurses', response.data)
+
+    def test_patients_cannot_assign(self):
+        response = client_for(make_user('patient')).post('/api/patients/bulk-assign/', {}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class DeactivatedPatientTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_user('admin'))
+        self.patient = make_patient(email='gone@example.com')
+        Patient.objects.filter(pk=self.patient.pk).deactivate()
+
+    def test_hidden_unless_asked_for(self):
+        self.assertNotIn(self.patient.pk, [row['id'] for row in self.client.get('/api/patients/').data['results']])
+        listed = self.client.get('/api/patients/?include_inactive=1').data['results']
+        self.assertIn(self.patient.pk, [row['id'] for row in listed])
+
+    def test_email_stays_taken(self):
+        fields = {
+            'first_name': 'New', 'last_name': 'Person', 'date_of_birth': '1990-01-01', 'gender': 'female',
+            'blood_group': 'O+', 'email': 'gone@example.com', 'phone': '555-0199', 'address': '2 Main St',
+            'city': 'Springfield', 'state': 'IL', 'zip_code': '62701', 'emergency_contact_name': 'Contact',
+            'emergency_contact_phone': '555-0100', 'emergency_contact_relation': 'Sibling',
+        }
+        response = self.client.post('/api/patients/?allow_duplicate=1', fields, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        response = self.client.post('/api/auth/signup/', {**fields, 'password': 'Test-pass-123'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+
+    def test_cannot_be_bulk_assigned(self):
+        response = self.client.post('/api/patients/bulk-assign/', {
+            'patients': [self.patient.pk], 'nurses': [make_user('nurse').pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PatientActivityTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.nurse = make_user('nurse')
+        self.patient = make_patient()
+        self.tomorrow = timezone.localdate() + timedelta(days=1)
+
+    def activity(self):
+        return PatientActivity.objects.get(patient=self.patient)
+
+    def book(self, day, at=time(10, 0)):
+        return Appointment.objects.create(patient=self.patient, doctor=self.doctor, appointment_date=day,
+                                          appointment_time=at, reason='Check-up')
+
+    def test_appointments_adjust_total_and_next(self):
+        later = self.book(self.tomorrow, time(15, 0))
+        sooner = self.book(self.tomorrow, time(9, 0))
+        self.book(self.tomorrow - timedelta(days=7))
+        self.assertEqual(self.activity().total_appointments, 3)
+        self.assertEqual(self.activity().next_appointment_at, sooner.starts_at)
+        sooner.status = 'cancelled'
+        sooner.save()
+        self.assertEqual(self.activity().next_appointment_at, later.starts_at)
+        later.delete()
+        self.assertEqual((self.activity().total_appointments, self.activity().next_appointment_at), (2, None))
+
+    def test_tasks_adjust_open_count(self):
+        first = NurseTask.objects.create(nurse=self.nurse, patient=self.patient, title='Obs', scheduled_time='10:00')
+        NurseTask.objects.create(nurse=self.nurse, patient=self.patient, title='Meds', scheduled_time='11:00')
+        self.assertEqual(self.activity().open_nurse_tasks, 2)
+        first.completed = True
+        first.save()
+        first.save()
+        self.assertEqual(self.activity().open_nurse_tasks, 1)
+        first.delete()
+        self.assertEqual(self.activity().open_nurse_tasks, 1)
+        NurseTask.objects.filter(completed=False).get().delete()
+        self.assertEqual(self.activity().open_nurse_tasks, 0)
+
+    def test_records_adjust_last_visit(self):
+        now = timezone.now()
+        latest = MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, visit_date=now,
+                                              diagnosis='Flu', symptoms='Fever')
+        MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, visit_date=now - timedelta(days=3),
+                                     diagnosis='Cold', symptoms='Cough')
+        self.assertEqual(self.activity().last_visit_date, now)
+        latest.delete()
+        self.assertEqual(self.activity().last_visit_date, now - timedelta(days=3))
+
+    def test_archiving_keeps_totals(self):
+        old = self.book(timezone.localdate() - timedelta(days=800))
+        Appointment.objects.filter(pk=old.pk).update(status='completed')
+        call_command('archive_history', stdout=StringIO())
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(self.activity().total_appointments, 1)
+
+    def test_rebuild_repairs_drift(self):
+        self.book(self.tomorrow)
+        PatientActivity.objects.update(total_appointments=99, next_appointment_at=None)
+        call_command('rebuild_patient_activity', stdout=StringIO())
+        self.assertEqual(self.activity().total_appointments, 1)
+        self.assertIsNotNone(self.activity().next_appointment_at)
+
+
+class DuplicatePatientTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_user('receptionist'))
+        self.existing = make_patient(first_name='Katherine', last_name='Smith', phone='(555) 010-9999')
+
+    def register(self, query='', **fields):
+        body = {
+            'first_name': 'Catherine', 'last_name': 'Smyth', 'date_of_birth': '1980-01-01', 'gender': 'female',
+            'blood_group': 'O+', 'email': 'new@example.com', 'phone': '555.010.9999', 'address': '2 Main St',
+            'city': 'Springfield', 'state': 'IL', 'zip_code': '62701', 'emergency_contact_name': 'Contact',
+            'emergency_contact_phone': '555-0100', 'emergency_contact_relation': 'Sibling', **fields,
+        }
+        return self.client.post(f'/api/patients/{query}', body, format='json')
+
+    def test_likely_duplicates_need_confirmation(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([row['id'] for row in response.data['candidates']], [self.existing.pk])
+        response = self.register('?allow_duplicate=1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(list(PossibleDuplicate.objects.values_list('patient', 'duplicate_of')),
+                         [(response.data['id'], self.existing.pk)])
+
+    def test_unrelated_patients_register_directly(self):
+        self.assertEqual(self.register(first_name='Oliver', last_name='Jones', phone='555-0200').status_code, 201)
+
+    def test_blocking_keys_are_not_exposed(self):
+        data = self.client.get(f'/api/patients/{self.existing.pk}/').data
+        self.assertFalse({'surname_key', 'given_key', 'phone_key'} & set(data))
+
+
+class DuplicateScanTests(TestCase):
+    def setUp(self):
+        # Each neighbouring pair shares one blocking key; the first and last share none
+        self.first = make_patient(first_name='Katherine', last_name='Smith', phone='555-010-1111',
+                                  date_of_birth=date(1980, 1, 2))
+        self.middle = make_patient(first_name='Catherine', last_name='Smith', phone='(555) 010 1111',
+                                   date_of_birth=date(1980, 2, 1))
+        self.last = make_patient(first_name='Catherine', last_name='Smyth', phone='555-020-2222',
+                                 date_of_birth=date(1980, 2, 1))
+        make_patient(first_name='Oliver', last_name='Jones')
+
+    def test_clusters_join_across_blocking_keys(self):
+        clusters, pairs = find_clusters()
+        self.assertEqual(clusters, [[self.first.pk, self.middle.pk, self.last.pk]])
+        self.assertEqual(set(pairs), {(self.first.pk, self.middle.pk), (self.middle.pk, self.last.pk)})
+
+    def test_recording_skips_pairs_already_flagged(self):
+        PossibleDuplicate.objects.create(patient=self.middle, duplicate_of=self.first, score=0.9)
+        for _ in range(2):
+            call_command('find_duplicate_patients', '--record', stdout=StringIO())
+        self.assertEqual(set(PossibleDuplicate.objects.values_list('patient', 'duplicate_of')),
+                         {(self.middle.pk, self.first.pk), (self.last.pk, self.middle.pk)})
+        self.assertEqual(PossibleDuplicate.objects.count(), 2)
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.nurse = make_user('nurse')
+        self.patient = make_patient()
+        self.client = client_for(make_user('admin'))
+        now = timezone.now().replace(microsecond=0)
+        for days in range(3):
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, reason='Check-up',
+                                       appointment_date=timezone.localdate(now) - timedelta(days=days),
+                                       appointment_time=time(9, days))
+            # Several records at the same moment exercise the id tie-break
+            for _ in range(2):
+                MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, diagnosis='Flu',
+                                             symptoms='Fever', visit_date=now - timedelta(days=days))
+        task = NurseTask.objects.create(nurse=self.nurse, patient=self.patient, title='Obs', scheduled_time='10:00')
+        NurseTask.objects.filter(pk=task.pk).update(created_at=now - timedelta(days=1))
+
+    def walk(self, query=''):
+        url = f'/api/patients/{self.patient.pk}/timeline/?page_size=2{query}'
+        events = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            events += response.data['results']
+            url = response.data['next']
+        return events
+
+    def test_pages_cover_every_event_once_newest_first(self):
+        events = self.walk()
+        self.assertEqual(len(events), 10)
+        self.assertEqual(len({(event['type'], event['id']) for event in events}), 10)
+        timestamps = [event['timestamp'] for event in events]
+        self.assertEqual(timestamps, sorted(timestamps, reverse=True))
+
+    def test_archived_history_is_included_on_request(self):
+        Appointment.objects.filter(appointment_date__lt=timezone.localdate() - timedelta(days=1)).update(
+            status='completed', appointment_date=timezone.localdate() - timedelta(days=800))
+        call_command('archive_history', stdout=StringIO())
+        self.assertEqual(len(self.walk()), 9)
+        archived = [event for event in self.walk('&include_archived=1') if event.get('archived')]
+        self.assertEqual([event['type'] for event in archived], ['appointment'])
+
+    def test_malformed_cursors_are_rejected(self):
+        naive = base64.urlsafe_b64encode(json.dumps(['2026-01-01T00:00:00', 1, 1]).encode()).decode()
+        for cursor in ('not-a-cursor', naive):
+            response = self.client.get(f'/api/patients/{self.patient.pk}/timeline/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404, cursor)
+
+
+class AgeFilterTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = client_for(make_user('admin'))
+        # The same clock as PatientQuerySet.with_age()
+        today = date.today()
+        self.child = make_patient(date_of_birth=years_before(today, 8) - timedelta(days=1))
+        self.adult = make_patient(date_of_birth=years_before(today, 40) - timedelta(days=1))
+
+    def ids(self, query):
+        response = self.client.get(f'/api/patients/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data['results']}
+
+    def test_filters_on_age_range(self):
+        self.assertEqual(self.ids('age_min=18'), {self.adult.pk})
+        self.assertEqual(self.ids('age_max=8'), {self.child.pk})
+        self.assertEqual(self.ids('age_min=8&age_max=40'), {self.child.pk, self.adult.pk})
+
+    def test_out_of_range_ages_are_rejected(self):
+        for query in ('age_min=5000', 'age_max=-1', 'age_min=abc'):
+            response = self.client.get(f'/api/patients/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_histogram_counts_age_bands(self):
+        response = self.client.get('/api/patients/age-histogram/?band=10&by=gender')
+        self.assertEqual([(band['band'], band['total']) for band in response.data['bands']], [('0-9', 1), ('40-49', 1)])
+        self.assertEqual(self.client.get('/api/patients/age-histogram/?age_min=900').status_code, 400)
+
+    def test_histogram_ignores_list_ordering(self):
+        for field in ('total_appointments', '-next_appointment_at', 'age'):
+            response = self.client.get(f'/api/patients/age-histogram/?ordering={field}&search={self.child.last_name}')
+            self.assertEqual(response.status_code, 200, field)
+            self.assertEqual([band['total'] for band in response.data['bands']], [1])
+
+
+class ClinicalTextTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.doctor = make_user('doctor')
+        self.client = client_for(self.doctor)
+        self.patient = make_patient()
+
+    def create(self, **fields):
+        response = self.client.post('/api/medical-records/', {
+            'patient': self.patient.pk, 'doctor': self.doctor.pk, 'visit_date': timezone.now().isoformat(),
+            'diagnosis': 'Flu', 'symptoms': 'Fever', **fields,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_long_text_is_stored_compressed(self):
+        notes = ' '.join(['Stable overnight.'] * 200)
+        pk = self.create(notes=notes)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT notes FROM {MedicalRecordText._meta.db_table} WHERE record_id = %s', [pk])
+            stored = bytes(cursor.fetchone()[0])
+        self.assertEqual(stored[:1], b'\x01')
+        self.assertLess(len(stored), len(notes) // 10)
+        self.assertEqual(self.client.get(f'/api/medical-records/{pk}/').data['notes'], notes)
+
+    def test_lists_leave_text_out_unless_asked(self):
+        self.create(prescription='Rest')
+        row = self.client.get('/api/medical-records/').data['results'][0]
+        self.assertNotIn('diagnosis', row)
+        row = self.client.get('/api/medical-records/?fields=diagnosis,prescription').data['results'][0]
+        self.assertEqual((row['diagnosis'], row['prescription']), ('Flu', 'Rest'))
+        self.assertNotIn('notes', row)
+
+    def test_patient_text_lives_on_the_side_row(self):
+        url = f'/api/patients/{self.patient.pk}/'
+        self.client.patch(url, {'allergies': 'Penicillin'}, format='json')
+        self.assertEqual(Patient.objects.get(pk=self.patient.pk).clinical_text.allergies, 'Penicillin')
+        self.assertEqual(self.client.get(url + '?fields=allergies').data['allergies'], 'Penicillin')
+        self.assertNotIn('allergies', self.client.get(url + '?fields=').data)
@@ -0,0 +1,150 @@
+import base64
+import heapq
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def _name(user):
+    return user.get_full_name() or user.username if user else None
+
+
+def _appointment_at(row):
+    return timezone.make_aware(datetime.combine(row.appointment_date, row.appointment_time))
+
+
+def _appointment(row, archived=False):
+    return {
+        'appointment_id': row.appointment_id,
+        'status': row.status,
+        'appointment_type': row.appointment_type,
+        'doctor_name': _name(row.doctor),
+        'reason': row.reason,
+        'archived': archived,
+    }
+
+
+def _medical_record(row, archived=False):
+    return {
+        'diagnosis': row.diagnosis,
+        'doctor_name': _name(row.doctor),
+        'archived': archived,
+    }
+
+
+class Stream:
+    """One per-patient event source, read newest first in keyset-paginated chunks"""
+
+    def __init__(self, kind, rank, queryset, ts_fields, timestamp, describe):
+        self.kind = kind
+        self.rank = rank
+        self.queryset = queryset.order_by(*(f'-{field}' for field in ts_fields), '-id')
+        self.ts_fields = ts_fields
+        self.timestamp = timestamp
+        self.describe = describe
+
+    def _ts_values(self, moment):
+        if len(self.ts_fields) == 2:
+            # Appointments store a local date and time
+            local = timezone.localtime(moment)
+            return [local.date(), local.time()]
+        return [moment]
+
+    def _older_than(self, cursor):
+        """Rows that sort after `cursor` in the merged (timestamp, rank, id) descending order"""
+        moment, rank, pk = cursor
+        pairs = list(zip(self.ts_fields, self._ts_values(moment)))
+        if self.rank == rank:
+            pairs.append(('id', pk))
+        q = Q(pk__in=[])
+        for i, (field, value) in enumerate(pairs):
+            q |= Q(**dict(pairs[:i]), **{f'{field}__lt': value})
+        if self.rank < rank:
+            # Same timestamp but a lower rank still comes after the cursor
+            q |= Q(**dict(pairs))
+        return q
+
+    def events(self, cursor, chunk_size):
+        while True:
+            queryset = self.queryset.filter(self._older_than(cursor)) if cursor else self.queryset
+            rows = list(queryset[:chunk_size])
+            for row in rows:
+                yield self.timestamp(row), self.rank, row.pk, self, row
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]
+            cursor = (self.timestamp(last), self.rank, last.pk)
+
+
+def streams(patient, include_archived=False):
+    sources = [
+        Stream('appointment', 5, patient.appointments.select_related('doctor'),
+               ('appointment_date', 'appointment_time'), _appointment_at, _appointment),
+        Stream('medical_record', 4, patient.medical_records.select_related('doctor', 'clinical_text'),
+               ('visit_date',), lambda row: row.visit_date, _medical_record),
+        Stream('nurse_task', 3, patient.nursetask_set.select_related('nurse'),
+               ('created_at',), lambda row: row.created_at, lambda row: {
+                   'title': row.title,
+                   'scheduled_time': row.scheduled_time,
+                   'completed': row.completed,
+                   'nurse_name': _name(row.nurse),
+               }),
+        Stream('assignment', 2, patient.assignment_logs.select_related('assigned_nurse', 'assigned_by'),
+               ('timestamp',), lambda row: row.timestamp, lambda row: {
+                   'assigned_nurse_name': _name(row.assigned_nurse),
+                   'assigned_by_name': _name(row.assigned_by),
+               }),
+    ]
+    if include_archived:
+        sources += [
+            Stream('appointment', 1, patient.archived_appointments.select_related('doctor'),
+                   ('appointment_date', 'appointment_time'), _appointment_at,
+                   lambda row: _appointment(row, archived=True)),
+            Stream('medical_record', 0, patient.archived_medical_records.select_related('doctor'),
+                   ('visit_date',), lambda row: row.visit_date,
+                   lambda row: _medical_record(row, archived=True)),
+        ]
+    return sources
+
+
+def encode_cursor(moment, rank, pk):
+    raw = json.dumps([moment.isoformat(), rank, pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(token):
+    """(timestamp, rank, id) from a cursor token, or None if it is malformed"""
+    try:
+        moment, rank, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+        moment = parse_datetime(moment)
+    except (TypeError, ValueError):
+        return None
+    # encode_cursor only writes aware timestamps; a naive one cannot be compared with them
+    if moment is None or timezone.is_naive(moment) or not isinstance(rank, int) or not isinstance(pk, int):
+        return None
+    return moment, rank, pk
+
+
+def page(patient, cursor=None, size=20, include_archived=False):
+    """
+    One page of the patient's history, newest first, and the cursor of the next page.
+
+    Each source is read in index order in chunks of `size` + 1 rows starting
+    just past the cursor and the sources are k-way merged lazily, so a page
+    costs one small query per source however long the history is.
+    """
+    merged = heapq.merge(
+        *(source.events(cursor, size + 1) for source in streams(patient, include_archived)),
+        key=lambda event: event[:3], reverse=True,
+    )
+    events = list(islice(merged, size + 1))
+    results = [
+        {'type': source.kind, 'id': row.pk, 'timestamp': moment, **source.describe(row)}
+        for moment, rank, pk, source, row in events[:size]
+    ]
+    next_cursor = encode_cursor(*events[size - 1][:3]) if len(events) > size else None
+    return results, next_cursor
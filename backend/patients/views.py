@@ -1,18 +1,49 @@
+import heapq
+from operator import attrgetter
+from django.db import transaction
+from django.db.models import Count, F
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from hms_config.db_routers import ReplicaReadMixin
+from hms_config.idempotency import IdempotentCreateMixin
+from hms_config.object_cache import CachedRetrieveMixin
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Patient, MedicalRecord
-from .serializers import PatientSerializer, PatientListSerializer, MedicalRecordSerializer
+from .models import Patient, MedicalRecord, cancel_future_appointments
+from .assignment import bulk_assign as assign_nurses_by_workload
+from . import timeline
+from .filters import PatientFilter
+from .duplicates import describe, find_candidates, record as record_duplicates
+from .serializers import PatientSerializer, PatientListSerializer, MedicalRecordSerializer, BulkNurseAssignmentSerializer
 
-class PatientViewSet(viewsets.ModelViewSet):
+def include_archived(request):
+    return request.query_params.get('include_archived') in ('1', 'true')
+
+def include_inactive(request):
+    return request.query_params.get('include_inactive') in ('1', 'true')
+
+def allow_duplicate(request):
+    return request.query_params.get('allow_duplicate') in ('1', 'true')
+
+def text_fields(request, model, default):
+    """Clinical text fields asked for with ?fields=a,b, or `default` without it"""
+    fields = request.query_params.get('fields')
+    if fields is None:
+        return default
+    return [name for name in fields.split(',') if name in model.CLINICAL_TEXT_FIELDS]
+
+
+class PatientViewSet(CachedRetrieveMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Patient.objects.all()
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['blood_group', 'gender', 'is_active']
+    filterset_class = PatientFilter
     search_fields = ['first_name', 'last_name', 'patient_id', 'email', 'phone']
-    ordering_fields = ['registered_date', 'first_name', 'last_name']
+    ordering_fields = ['registered_date', 'first_name', 'last_name', 'age',
+                       'total_appointments', 'next_appointment_at', 'last_visit_date', 'open_nurse_tasks']
     ordering = ['-registered_date']
     
     def get_serializer_class(self):
@@ -20,11 +51,74 @@ class PatientViewSet(viewsets.ModelViewSet):
             return PatientListSerializer
         return PatientSerializer
     
+    def _patients(self):
+        if include_inactive(self.request) and self.request.user.role != 'patient':
+            return Patient.all_objects.all()
+        return super().get_queryset()
+    
+    def get_queryset(self):
+        queryset = self._patients()
+        if self.action != 'list':
+            queryset = queryset.select_related('clinical_text')
+        # One join against the precomputed activity row, no per-patient counting
+        return queryset.with_age().annotate(
+            total_appointments=F('activity__total_appointments'),
+            next_appointment_at=F('activity__next_appointment_at'),
+            last_visit_date=F('activity__last_visit_date'),
+            open_nurse_tasks=F('activity__open_nurse_tasks'),
+        )
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request.method == 'GET':
+            context['text_fields'] = text_fields(self.request, Patient, Patient.CLINICAL_TEXT_FIELDS)
+        return context
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        candidates = find_candidates(serializer.validated_data)
+        if candidates and not allow_duplicate(request):
+            return Response({
+                'error': 'This patient may already be registered. Resubmit with ?allow_duplicate=1 to create anyway.',
+                'candidates': describe(candidates),
+            }, status=status.HTTP_409_CONFLICT)
+        patient = serializer.save()
+        record_duplicates(patient, candidates)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    def perform_update(self, serializer):
+        was_active = serializer.instance.is_active
+        with transaction.atomic():
+            patient = serializer.save()
+            if was_active and not patient.is_active:
+                cancel_future_appointments([patient.pk])
+    
+    @action(detail=True, methods=['get'])
+    def duplicates(self, request, pk=None):
+        if request.user.role == 'patient':
+            return Response({'error': 'Forbidden'}, status=403)
+        patient = self.get_object()
+        candidates = find_candidates({
+            'first_name': patient.first_name, 'last_name': patient.last_name,
+            'date_of_birth': patient.date_of_birth, 'phone': patient.phone,
+        }, exclude_id=patient.pk)
+        return Response(describe(candidates))
+    
     @action(detail=True, methods=['get'])
     def medical_records(self, request, pk=None):
         patient = self.get_object()
-        records = patient.medical_records.all()
-        serializer = MedicalRecordSerializer(records, many=True)
+        # No clinical text unless asked for, e.g. ?fields=diagnosis,prescription
+        fields = text_fields(request, MedicalRecord, [])
+        records = patient.medical_records.select_related('doctor')
+        if fields:
+            records = records.select_related('clinical_text')
+        if include_archived(request):
+            records = list(heapq.merge(
+                records, patient.archived_medical_records.all(),
+                key=attrgetter('visit_date'), reverse=True,
+            ))
+        serializer = MedicalRecordSerializer(records, many=True, context={'text_fields': fields})
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -32,9 +126,61 @@ class PatientViewSet(viewsets.ModelViewSet):
         patient = self.get_object()
         from appointments.serializers import AppointmentListSerializer
         appointments = patient.appointments.all()
+        if include_archived(request):
+            appointments = list(heapq.merge(
+                appointments, patient.archived_appointments.all(),
+                key=attrgetter('appointment_date', 'appointment_time'),
+            ))
         serializer = AppointmentListSerializer(appointments, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Appointments, medical records, nurse tasks and nurse assignments, newest first"""
+        patient = self.get_object()
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            cursor = timeline.decode_cursor(cursor)
+            if cursor is None:
+                raise NotFound('Invalid cursor')
+        try:
+            size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+        except ValueError:
+            size = 20
+        results, next_cursor = timeline.page(patient, cursor, size, include_archived(request))
+        return Response({
+            'next': replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None,
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['get'], url_path='age-histogram')
+    def age_histogram(self, request):
+        """Patient counts per age band and `?by=` blood_group or gender, in one GROUP BY query"""
+        if request.user.role == 'patient':
+            return Response({'error': 'Forbidden'}, status=403)
+        by = request.query_params.get('by', 'blood_group')
+        if by not in ('blood_group', 'gender'):
+            return Response({'by': 'Must be blood_group or gender.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            width = min(max(int(request.query_params.get('band', 10)), 1), 120)
+        except ValueError:
+            width = 10
+        # Honours the list filters, e.g. ?assigned_nurse=<id>&age_min=65, but not ?ordering=: the
+        # grouping drops it anyway and some ordering fields are only annotated by get_queryset()
+        queryset = self._patients().with_age()
+        for backend in (DjangoFilterBackend, filters.SearchFilter):
+            queryset = backend().filter_queryset(request, queryset, self)
+        rows = (queryset.annotate(band=queryset.age_band(width)).order_by()
+                .values_list('band', by).annotate(count=Count('id')))
+        bands = {}
+        for band, value, count in rows:
+            entry = bands.setdefault(band, {
+                'band': f'{band * width}-{band * width + width - 1}', 'total': 0, 'counts': {},
+            })
+            entry['counts'][value] = count
+            entry['total'] += count
+        return Response({'by': by, 'band_width': width, 'bands': [bands[band] for band in sorted(bands)]})
+    
     @action(detail=False, methods=['get'], url_path='assigned-to-me')
     def assigned_to_me(self, request):
         nurse = request.user
@@ -43,11 +189,49 @@ class PatientViewSet(viewsets.ModelViewSet):
         patients = self.get_queryset().filter(assigned_nurse=nurse)
         serializer = self.get_serializer(patients, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-assign')
+    def bulk_assign(self, request):
+        if request.user.role not in ('admin', 'nurse'):
+            return Response({'error': 'Forbidden'}, status=403)
+        serializer = BulkNurseAssignmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assignments, loads, changed = assign_nurses_by_workload(
+            serializer.validated_data['patients'],
+            serializer.validated_data['nurses'],
+            request.user,
+        )
+        return Response({
+            'changed': changed,
+            'assignments': [{'patient': patient, 'nurse': nurse} for patient, nurse in assignments.items()],
+            'loads': loads,
+        })
 
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(IdempotentCreateMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['patient', 'doctor', 'visit_date']
     ordering = ['-visit_date']
+    
+    def _text_fields(self):
+        # Lists carry no clinical text unless asked for; a single record carries all of it
+        if self.request.method != 'GET':
+            return None
+        default = [] if self.action == 'list' else MedicalRecord.CLINICAL_TEXT_FIELDS
+        return text_fields(self.request, MedicalRecord, default)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('patient', 'doctor')
+        fields = self._text_fields()
+        if fields is None or fields:
+            queryset = queryset.select_related('clinical_text')
+        return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        fields = self._text_fields()
+        if fields is not None:
+            context['text_fields'] = fields
+        return context
@@ -10,6 +10,7 @@ const BookAppointment = () => {
   const [loading, setLoading] = useState(false);
   const [patientProfile, setPatientProfile] = useState(null);
   const [doctors, setDoctors] = useState([]);
+  const [slots, setSlots] = useState(null);
 
   const [formData, setFormData] = useState({
     appointment_date: "",
@@ -23,6 +24,14 @@ const BookAppointment = () => {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    fetchDoctors(formData.appointment_date);
+  }, [formData.appointment_date]);
+
+  useEffect(() => {
+    fetchSlots(formData.doctor, formData.appointment_date);
+  }, [formData.doctor, formData.appointment_date, doctors]);
+
   const fetchData = async () => {
     try {
       // Get patient profile
@@ -32,18 +41,73 @@ const BookAppointment = () => {
       const patientData =
         profileResponse.data.results?.[0] || profileResponse.data[0];
       setPatientProfile(patientData);
-
-      // Fetch available doctors
-      const doctorsResponse = await api.get("/auth/doctors/");
-      setDoctors(doctorsResponse.data || []);
     } catch (error) {
       console.error("Error fetching data:", error);
     }
   };
 
+  // Only doctors who work on the chosen date and still have a free slot
+  const fetchDoctors = async (date) => {
+    try {
+      const params = { page_size: 100 };
+      if (date) {
+        params.available_on = date;
+      }
+      const doctorsResponse = await api.get("/doctors/", { params });
+      setDoctors(doctorsResponse.data.results || []);
+    } catch (error) {
+      console.error("Error fetching doctors:", error);
+    }
+  };
+
+  // The slot API is keyed by doctor profile id; the form stores the doctor's user id
+  const doctorProfileId = (doctorUser) =>
+    doctors.find((doctor) => String(doctor.user) === String(doctorUser))?.id;
+
+  // Free times for the chosen doctor and date, without slots other users are holding
+  const fetchSlots = async (doctorUser, date) => {
+    const profileId = doctorProfileId(doctorUser);
+    if (!profileId || !date) {
+      setSlots(null);
+      return;
+    }
+    try {
+      const response = await api.get(`/doctors/${profileId}/slots/`, {
+        params: { date },
+      });
+      setSlots(response.data);
+    } catch (error) {
+      console.error("Error fetching slots:", error);
+      setSlots(null);
+    }
+  };
+
+  // Reserve the slot while the rest of the form is filled in
+  const holdSlot = async (time) => {
+    const profileId = doctorProfileId(formData.doctor);
+    if (!profileId || !time) {
+      return;
+    }
+    try {
+      await api.post(`/doctors/${profileId}/hold/`, {
+        date: formData.appointment_date,
+        time,
+      });
+    } catch (error) {
+      if (error.response?.status === 409) {
+        alert("Someone else is booking this slot. Please choose another time.");
+        setFormData((prev) => ({ ...prev, appointment_time: "" }));
+        fetchSlots(formData.doctor, formData.appointment_date);
+      }
+    }
+  };
+
   const handleChange = (e) => {
     const { name, value } = e.target;
     setFormData((prev) => ({ ...prev, [name]: value }));
+    if (name === "appointment_time") {
+      holdSlot(value);
+    }
   };
 
   const handleSubmit = async (e) => {
@@ -75,6 +139,11 @@ const BookAppointment = () => {
       navigate("/dashboard/patient/appointments");
     } catch (error) {
       console.error("Error booking appointment:", error);
+      if (error.response?.status === 409) {
+        alert("This slot was just taken. Please choose another time.");
+        fetchSlots(formData.doctor, formData.appointment_date);
+        return;
+      }
       alert("Failed to book appointment. Please try again.");
     } finally {
       setLoading(false);
@@ -91,7 +160,7 @@ const BookAppointment = () => {
     return slots;
   };
 
-  const timeSlots = generateTimeSlots();
+  const timeSlots = slots ?? generateTimeSlots();
 
   if (!patientProfile) {
     return (
@@ -152,8 +221,9 @@ const BookAppointment = () => {
           >
             <option value="">Choose a doctor</option>
             {doctors.map((doctor) => (
-              <option key={doctor.id} value={doctor.id}>
+              <option key={doctor.id} value={doctor.user}>
                 Dr. {doctor.last_name || doctor.first_name || doctor.username}
+                {doctor.specialty ? ` (${doctor.specialty})` : ""}
               </option>
             ))}
           </select>
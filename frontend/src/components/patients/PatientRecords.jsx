@@ -35,7 +35,7 @@ const PatientRecords = () => {
 
       // Fetch medical records
       const response = await api.get(
-        `/patients/${patientData.id}/medical_records/`
+        `/patients/${patientData.id}/medical_records/?fields=diagnosis,symptoms,prescription,notes`
       );
       setRecords(response.data || []);
     } catch (error) {
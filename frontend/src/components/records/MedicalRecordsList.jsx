@@ -50,7 +50,7 @@ const MedicalRecordsPage = () => {
                 className="px-3 py-2 bg-blue-600 hover:bg-blue-700 text-white rounded-lg text-sm"
                 onClick={async () => {
                   const response = await api.get(
-                    `/medical-records/?patient=${patient.id}`
+                    `/medical-records/?patient=${patient.id}&fields=diagnosis,symptoms,prescription,lab_results,notes`
                   );
                   const records = response.data.results || response.data;
                   const record = Array.isArray(records) ? records[0] : records;
@@ -80,7 +80,7 @@ const PatientDashboard = ({ children }) => {
 
       // Fetch medical records
       const recordsResponse = await api.get(
-        `/patients/${patientData.id}/medical_records/`
+        `/patients/${patientData.id}/medical_records/?fields=diagnosis,symptoms`
       );
       const records = recordsResponse.data || [];
       setRecentRecords(records.slice(0, 3));
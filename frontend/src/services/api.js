@@ -16,6 +16,10 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Retries after a token refresh reuse this config, so the server can replay instead of re-creating
+    if (config.method === 'post' && !config.headers['Idempotency-Key']) {
+      config.headers['Idempotency-Key'] = crypto.randomUUID();
+    }
     return config;
   },
   (error) => Promise.reject(error)
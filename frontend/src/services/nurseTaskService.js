@@ -5,4 +5,8 @@ export const nurseTaskService = {
   completeTask: (taskId) =>
     api.patch(`/nurse-tasks/tasks/${taskId}/`, { completed: true }),
   createTask: (data) => api.post("/nurse-tasks/tasks/", data),
+  // Assigned patients with latest vitals, open tasks, today's appointments and assignment changes
+  getHandover: () => api.get("/nurse/handover/"),
+  // { completed_tasks: [taskId, ...], vitals: [{ patient, heart_rate, ... }, ...] }
+  submitRound: (round) => api.post("/nurse/rounds/", round),
 };
@@ -28,7 +28,9 @@ export const patientService = {
 
   // Get patient's medical records
   getPatientRecords: (patientId) => {
-    return api.get(`/patients/${patientId}/medical_records/`);
+    return api.get(`/patients/${patientId}/medical_records/`, {
+      params: { fields: "diagnosis,symptoms,prescription,notes" },
+    });
   },
 
   // Get patient's appointments